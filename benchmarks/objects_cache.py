@@ -0,0 +1,40 @@
+'''
+Compares lookup of the first cached substring contained in a parameter string:
+linear scan of a plain dict vs the trie index of ObjectsCache (forced by disabling its linear scan for small sizes).
+
+Run: python -m benchmarks.objects_cache
+'''
+import random
+import timeit
+
+from stark.core.patterns import ObjectsCache
+from stark.core.patterns.objects_cache import find_contained
+from stark.core.types import Word
+
+
+def random_word() -> str:
+    return ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(random.randint(3, 10)))
+
+def main():
+    random.seed(0)
+    print(f'{"cache size":>10} {"linear, µs":>12} {"indexed, µs":>12}')
+    
+    for size in [10, 100, 1000, 10000]:
+        plain = {}
+        indexed = ObjectsCache()
+        indexed.linear_scan_limit = 0
+        
+        for _ in range(size):
+            substring = ' '.join(random_word() for _ in range(random.randint(1, 3)))
+            plain[substring] = indexed[substring] = Word(substring)
+            
+        strings = [' '.join(random_word() for _ in range(5)) for _ in range(100)]
+        
+        linear_time = timeit.timeit(lambda: [find_contained(plain, s) for s in strings], number = 10)
+        indexed_time = timeit.timeit(lambda: [indexed.find_contained(s) for s in strings], number = 10)
+        
+        per_lookup = lambda total: total / (10 * len(strings)) * 1e6
+        print(f'{size:>10} {per_lookup(linear_time):>12.2f} {per_lookup(indexed_time):>12.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+Regression benchmark for overlapping matches filtering on 1k-word inputs.
+
+Run: python -m benchmarks.overlaps
+'''
+import timeit
+
+import anyio
+
+from stark.core import Pattern, CommandsManager
+from stark.core.patterns import MatchResult
+from stark.core.types import Word
+
+
+WORDS = 1000
+
+def legacy_filter(matches: list[MatchResult]) -> list[MatchResult]:
+    # previous implementation with list.remove inside the loop
+    for prev, current in zip(matches.copy(), matches[1:]):
+        if prev.start == current.start or prev.end > current.start:
+            matches.remove(min(prev, current, key = lambda m: len(m.substring)))
+    return matches
+
+def overlapping_matches() -> list[MatchResult]:
+    # pairs of overlapping matches, the shorter one of each pair is removed
+    # (the legacy filter raises ValueError if one match overlaps both neighbours)
+    matches = []
+    for i in range(WORDS):
+        substring = 'word' if i % 2 else 'wordword'
+        start = i * 5 - i % 2 * 3
+        matches.append(MatchResult(substring = substring, start = start, end = start + len(substring), parameters = {'name': Word(substring)}))
+    return matches
+
+def main():
+    pattern = Pattern('$name:Word')
+    sweep_filter = pattern._filter_overlapping # current implementation of Pattern.match
+    
+    assert legacy_filter(overlapping_matches()) == sweep_filter(overlapping_matches())
+    
+    legacy_time = timeit.timeit(lambda: legacy_filter(overlapping_matches()), number = 10) / 10
+    sweep_time = timeit.timeit(lambda: sweep_filter(overlapping_matches()), number = 10) / 10
+    print(f'filter {WORDS} overlapping matches: legacy {legacy_time * 1e3:.2f} ms, sweep {sweep_time * 1e3:.2f} ms')
+    
+    string = ' '.join(['lorem', 'ipsum', 'dolor'] * (WORDS // 3))
+    
+    match_time = timeit.timeit(lambda: anyio.run(pattern.match, string), number = 10) / 10
+    print(f'Pattern.match with {len(anyio.run(pattern.match, string))} matches: {match_time * 1e3:.2f} ms')
+    
+    manager = CommandsManager()
+    
+    @manager.new('lorem ipsum')
+    def lorem(): pass
+    
+    @manager.new('ipsum dolor')
+    def ipsum(): pass
+    
+    @manager.new('dolor lorem')
+    def dolor(): pass
+    
+    search_time = timeit.timeit(lambda: anyio.run(manager.search, string), number = 10) / 10
+    print(f'CommandsManager.search with {len(anyio.run(manager.search, string))} overlapping results: {search_time * 1e3:.2f} ms')
+
+if __name__ == '__main__':
+    main()
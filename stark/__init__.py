@@ -1,10 +1,12 @@
 import asyncer
 
 from stark.interfaces.protocols import (
+    LazyLoading,
     SpeechRecognizer,
     SpeechRecognizerDelegate,
     SpeechSynthesizer,
-    SpeechSynthesizerResult
+    SpeechSynthesizerResult,
+    SpeechSynthesizerWarmUp
 )   
 from stark.core import (
     Command,
@@ -39,8 +41,16 @@ async def run(
         speech_recognizer.delegate = voice_assistant
         context.delegate = voice_assistant
         
+        # lazy interfaces load models in background, commands and text input work meanwhile
+        for interface in [speech_recognizer, speech_synthesizer]:
+            if isinstance(interface, LazyLoading) and not interface.is_ready:
+                main_task_group.soonify(interface.load)()
+        
         main_task_group.soonify(speech_recognizer.start_listening)()
         main_task_group.soonify(context.handle_responses)()
         
+        if isinstance(speech_synthesizer, SpeechSynthesizerWarmUp):
+            main_task_group.soonify(speech_synthesizer.warm_up)(manager.get_response_phrases())
+        
         detector = BlockageDetector()
         main_task_group.soonify(detector.monitor)()
@@ -24,14 +24,33 @@ CommandRunner = TypeVar('CommandRunner', bound = SyncCommandRunner | AsyncComman
 class Command(Generic[CommandRunner]):
     name: str
     pattern: Pattern
+    responses: list[str] # static voice responses, can be synthesized in advance
     _runner: CommandRunner
+    
+    # invocation plan, precomputed once to keep run() cheap
+    _async_runner: AsyncCommandRunner
+    _accepts_kwargs: bool
+    _parameter_names: frozenset[str]
 
-    def __init__(self, name: str, pattern: Pattern, runner: CommandRunner):
+    def __init__(self, name: str, pattern: Pattern, runner: CommandRunner, responses: list[str] | None = None):
         assert isinstance(pattern, Pattern)
         self.name = name
         self.pattern = pattern
+        self.responses = responses or []
         self._runner = runner
         update_wrapper(self, runner)
+        
+        if inspect.iscoroutinefunction(runner) or inspect.isasyncgen(runner):
+            # async functions (coroutines) and async generators are remain as is
+            self._async_runner = cast(AsyncCommandRunner, runner)
+        else:
+            # sync functions are wrapped with asyncer.asyncify to make them async (coroutines)
+            # async generators are not supported yet by asyncer.asyncify (https://github.com/tiangolo/asyncer/discussions/86)
+            self._async_runner = asyncer.asyncify(cast(SyncCommandRunner, runner))
+            
+        signature_parameters = inspect.signature(runner).parameters.values()
+        self._accepts_kwargs = any(p.kind == p.VAR_KEYWORD for p in signature_parameters)
+        self._parameter_names = frozenset(p.name for p in signature_parameters if p.kind not in {p.VAR_POSITIONAL, p.VAR_KEYWORD})
 
     def run(self, parameters_dict: dict[str, Any] | None = None, / , **kwparameters: dict[str, Any]) -> AwaitResponse:
         # allow call both with and without dict unpacking 
@@ -41,22 +60,14 @@ class Command(Generic[CommandRunner]):
         parameters = parameters_dict or {}
         parameters.update(kwparameters)
         
-        runner: AsyncCommandRunner
-        
-        if inspect.iscoroutinefunction(self._runner) or inspect.isasyncgen(self._runner):
-             # async functions (coroutines) and async generators are remain as is
-            runner = cast(AsyncCommandRunner, self._runner)
-        else:
-            # sync functions are wrapped with asyncer.asyncify to make them async (coroutines)
-            # async generators are not supported yet by asyncer.asyncify (https://github.com/tiangolo/asyncer/discussions/86)
-            runner = asyncer.asyncify(cast(SyncCommandRunner, self._runner))
+        runner = self._async_runner
             
-        if any(p.kind == p.VAR_KEYWORD for p in inspect.signature(self._runner).parameters.values()):
+        if self._accepts_kwargs:
             # if command runner accepts **kwargs, pass all parameters
             coroutine = runner(**parameters)
         else:
             # otherwise pass only parameters that are in command runner signature to prevent TypeError: got an unexpected keyword argument
-            coroutine = runner(**{k: v for k, v in parameters.items() if k in self._runner.__code__.co_varnames})
+            coroutine = runner(**{k: v for k, v in parameters.items() if k in self._parameter_names})
             
         @wraps(runner)
         async def coroutine_wrapper() -> ResponseOptions:
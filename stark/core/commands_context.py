@@ -1,15 +1,20 @@
 from __future__ import annotations
 from types import GeneratorType, AsyncGeneratorType
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Callable, Protocol, runtime_checkable
 from dataclasses import dataclass
 import warnings
+import copy
+import re
+from bisect import bisect_left
 
 import anyio
 from asyncer import syncify
 from asyncer._main import TaskGroup
 
-from ..general.dependencies import DependencyManager, default_dependency_manager
+from ..general.dependencies import DependencyManager, ScopedDependencies, default_dependency_manager
+from ..general.cache import LRUCache
 from .commands_manager import CommandsManager, SearchResult
+from .patterns import MatchResult
 from .command import Command, Response, ResponseHandler, AsyncResponseHandler, CommandRunner, ResponseOptions
 
 
@@ -30,17 +35,21 @@ class CommandsContext:
     dependency_manager: DependencyManager
     last_response: Response | None = None
     fallback_command: Command | None = None
+    search_cache: LRUCache[tuple[str, int, int], tuple[list[Command], list[SearchResult]]] | None # (utterance, commands id, manager version) -> (commands, results)
     
     _delegate: CommandsContextDelegate | None = None
     _response_queue: list[Response]
+    _response_event: anyio.Event | None = None # set when a response is queued or the handling is stopped
     _context_queue: list[CommandsContextLayer]
     _task_group: TaskGroup
     
-    def __init__(self, task_group: TaskGroup, commands_manager: CommandsManager, dependency_manager: DependencyManager = default_dependency_manager):
+    def __init__(self, task_group: TaskGroup, commands_manager: CommandsManager, dependency_manager: DependencyManager = default_dependency_manager, search_cache: LRUCache | None = None):
         assert isinstance(task_group, TaskGroup), task_group
         assert isinstance(commands_manager, CommandsManager)
         assert isinstance(dependency_manager, DependencyManager)
+        assert isinstance(search_cache, LRUCache) or search_cache is None
         self.commands_manager = commands_manager
+        self.search_cache = search_cache
         self._context_queue = [self.root_context]
         self._response_queue = []
         self._task_group = task_group
@@ -71,7 +80,7 @@ class CommandsContext:
         while self._context_queue:
             
             current_context = self._context_queue[0]
-            search_results = await self.commands_manager.search(string = string, commands = current_context.commands)
+            search_results = await self._search(string, current_context.commands)
             
             if search_results:
                 break
@@ -86,13 +95,66 @@ class CommandsContext:
                     index = 0
                 )]
 
+        # per-utterance provided dependencies are shared by all found commands and torn down after the last one finishes
+        utterance_scope = ScopedDependencies()
+
         for search_result in search_results or []:
 
             parameters = current_context.parameters
             parameters.update(search_result.match_result.parameters)
             parameters.update(self.dependency_manager.resolve(search_result.command._runner))
             
-            self.run_command(search_result.command, parameters)
+            self.run_command(search_result.command, parameters, utterance_scope)
+            
+    async def _search(self, string: str, commands: list[Command]) -> list[SearchResult]:
+        if self.search_cache is None:
+            return await self.commands_manager.search(string = string, commands = commands)
+        
+        # the same utterance with different spacing has the same results, positions are stored relative to the normalized string
+        normalized, positions = self._normalize_whitespace(string)
+        # cached value keeps the commands list alive, so its id can't be reused by another list while the entry exists
+        key = (normalized, id(commands), self.commands_manager.version)
+        
+        if cached := self.search_cache.get(key):
+            return self._copy_search_results(cached[1], lambda start, end: (
+                positions[start],
+                positions[end - 1] + 1 if end > start else positions[start]
+            ), string)
+        
+        search_results = await self.commands_manager.search(string = string, commands = commands)
+        # store a copy to protect cached parameters from modifications by commands
+        self.search_cache.set(key, (commands, self._copy_search_results(search_results, lambda start, end: (
+            bisect_left(positions, start),
+            bisect_left(positions, end)
+        ), normalized)))
+        return search_results
+    
+    @staticmethod
+    def _normalize_whitespace(string: str) -> tuple[str, list[int]]:
+        # collapses whitespace, returns the normalized string and positions of its characters in the original string
+        positions: list[int] = []
+        for word in re.finditer(r'\S+', string):
+            if positions:
+                positions.append(positions[-1] + 1) # the first whitespace after the previous word
+            positions.extend(range(word.start(), word.end()))
+        return ' '.join(string.split()), positions
+    
+    @staticmethod
+    def _copy_search_results(search_results: list[SearchResult], convert: Callable[[int, int], tuple[int, int]], string: str) -> list[SearchResult]:
+        results = []
+        for result in search_results:
+            start, end = convert(result.match_result.start, result.match_result.end)
+            results.append(SearchResult(
+                command = result.command,
+                match_result = MatchResult(
+                    substring = string[start:end],
+                    start = start,
+                    end = end,
+                    parameters = copy.deepcopy(result.match_result.parameters)
+                ),
+                index = result.index
+            ))
+        return results
             
     def inject_dependencies(self, runner: Command[CommandRunner] | CommandRunner) -> CommandRunner:
         def injected_func(**kwargs) -> ResponseOptions:
@@ -100,9 +162,22 @@ class CommandsContext:
             return runner(**kwargs) # type: ignore
         return injected_func # type: ignore
                 
-    def run_command(self, command: Command, parameters: dict[str, Any] = {}):
-        async def command_runner():
-            command_return = await command(parameters)
+    def run_command(self, command: Command, parameters: dict[str, Any] = {}, utterance_scope: ScopedDependencies | None = None):
+        if utterance_scope:
+            utterance_scope.retain()
+            
+        async def scoped_command_runner():
+            command_scope = ScopedDependencies()
+            try:
+                provided = await self.dependency_manager.resolve_providers(command._runner, command_scope, utterance_scope)
+                await command_runner(provided)
+            finally: # tear down provided dependencies even if the command failed
+                await command_scope.close()
+                if utterance_scope:
+                    await utterance_scope.release()
+            
+        async def command_runner(provided: dict[str, Any]):
+            command_return = await command({**parameters, **provided} if provided else parameters)
             
             if isinstance(command_return, Response):
                 await self.respond(command_return)
@@ -126,13 +201,14 @@ class CommandsContext:
             else:
                 raise TypeError(f'Command {command} returned {command_return} of type {type(command_return)} instead of Response or AsyncGeneratorType[Response]')
                 
-        self._task_group.soonify(command_runner)()
+        self._task_group.soonify(scoped_command_runner)()
 
     # ResponseHandler
     
     async def respond(self, response: Response): # async forces to run in main thread
         assert isinstance(response, Response)
         self._response_queue.append(response)
+        self._notify_responses()
     
     async def unrespond(self, response: Response):
         if response in self._response_queue:
@@ -157,10 +233,21 @@ class CommandsContext:
         while not self.is_stopped:
             while self._response_queue:
                 await self._process_response(self._response_queue.pop(0))
-            await anyio.sleep(0.01)
+                
+            if self.is_stopped:
+                break
+            
+            # anyio events can't be cleared, so wait for a new one; sleep until respond() or stop()
+            self._response_event = anyio.Event()
+            await self._response_event.wait()
             
     def stop(self):
         self.is_stopped = True
+        self._notify_responses()
+        
+    def _notify_responses(self):
+        if self._response_event:
+            self._response_event.set()
     
     async def _process_response(self, response: Response):
         if response is Response.repeat_last and self.last_response:
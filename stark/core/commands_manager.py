@@ -4,7 +4,8 @@ import inspect
 from asyncer import create_task_group, SoonValue
 import json
 
-from .patterns import Pattern, MatchResult
+from .patterns import Pattern, MatchResult, PatternIndex, ObjectsCache
+from .patterns.pattern import run_parse_jobs
 from .types import Object
 from .command import Command, CommandRunner, ResponseHandler, AsyncResponseHandler
 
@@ -19,10 +20,21 @@ class CommandsManager:
     
     name: str
     commands: list[Command]
+    use_pattern_index: bool
+    batch_parsing: bool # parse parameters of all matches of all commands in a single task group
+    version: int # increments on every change of commands
     
-    def __init__(self, name: str = ''):
+    _pattern_index: PatternIndex | None = None
+    _pattern_index_version: int = -1
+    _indexed_commands: list[Command]
+    _indexed_ids: set[int]
+    
+    def __init__(self, name: str = '', use_pattern_index: bool = False, batch_parsing: bool = False):
         self.name = name or 'CommandsManager'
         self.commands = []
+        self.use_pattern_index = use_pattern_index
+        self.batch_parsing = batch_parsing
+        self.version = 0
         
     def get_by_name(self, name: str) -> Command | None:
         for command in self.commands:
@@ -34,20 +46,32 @@ class CommandsManager:
         
         if not commands:
             commands = self.commands
+            
+        if self.use_pattern_index:
+            commands = self._filter_candidates(string, commands)
         
-        objects_cache: dict[str, Object] = {}
+        objects_cache = ObjectsCache()
         results: list[SearchResult] = []
-        futures: list[tuple[Command, SoonValue[list[MatchResult]]]] = []
+        commands_matches: list[tuple[Command, list[MatchResult]]]
         
-        # run concurent commands match
-        async with create_task_group() as group:
-            for command in commands:
-                futures.append((command, group.soonify(command.pattern.match)(string, objects_cache)))
+        if self.batch_parsing:
+            commands_matches = await self._batch_match(string, commands, objects_cache)
+        else:
+            futures: list[tuple[Command, SoonValue[list[MatchResult]]]] = []
+            
+            # run concurent commands match
+            async with create_task_group() as group:
+                for command in commands:
+                    if not command.pattern.could_match(string):
+                        continue # skip task for patterns that can't match anyway
+                    futures.append((command, group.soonify(command.pattern.match)(string, objects_cache)))
+                    
+            commands_matches = [(command, future.value) for command, future in futures]
         
         # read all finished matches
         i = 0
-        for command, future in futures:
-            for match in future.value: # may be empty for most of commands
+        for command, matches in commands_matches:
+            for match in matches: # may be empty for most of commands
                 results.append(SearchResult(
                     command = command,
                     match_result = match,
@@ -58,30 +82,9 @@ class CommandsManager:
         # resolve overlapped results
         
         results = sorted(results, key = lambda result: result.match_result.start)
-        
-        # copy to prevent affecting iteration by removing items; slice makes copy automatically
-        for prev, current in zip(results.copy(), results[1:]): # TODO: concurrent; optimize using cache
-            if prev.match_result.start == current.match_result.start or prev.match_result.end > current.match_result.start:
-                
-                # constrain prev end to current start
-                prev_cut = await prev.command.pattern.match(string[prev.match_result.start:current.match_result.start], objects_cache) 
-                # constrain current start to prev end
-                current_cut = await current.command.pattern.match(string[prev.match_result.end:current.match_result.end], objects_cache)
-
-                # less index = more priority to save full match
-                priority1, priority2 = (prev, current) if prev.index < current.index else (current, prev)
-                priority1_cut, priority2_cut = (prev_cut, current_cut) if prev.index < current.index else (current_cut, prev_cut)
-                
-                if new_matches := priority2_cut: # if can cut less priority
-                    priority2.match_result = new_matches[0]
-                elif new_matches := priority1_cut: # else if can cut more priority
-                    priority1.match_result = new_matches[0]
-                else: # else remove less priority
-                    results.remove(priority2)
-        
-        return results 
+        return await self._resolve_overlaps(string, results, objects_cache)
     
-    def new(self, pattern_str: str, hidden: bool = False):
+    def new(self, pattern_str: str, hidden: bool = False, responses: list[str] | None = None):
         def creator(runner: CommandRunner) -> Command:
             pattern = Pattern(pattern_str)
             
@@ -100,13 +103,118 @@ class CommandsManager:
             
             # create command
             
-            cmd = Command(f'{self.name}.{runner.__name__}', pattern, runner)
+            cmd = Command(f'{self.name}.{runner.__name__}', pattern, runner, responses)
             
             if not hidden:
                 self.commands.append(cmd)
+                self.version += 1
             
             return cmd
         return creator
     
     def extend(self, other_manager: CommandsManager):
         self.commands.extend(other_manager.commands)
+        self.version += 1
+        
+    def get_response_phrases(self) -> list[str]:
+        '''Static voice responses declared on commands, e.g. to synthesize them in advance.'''
+        return list(dict.fromkeys(phrase for command in self.commands for phrase in command.responses))
+        
+    def precompile(self):
+        '''Compile all patterns eagerly, e.g. at startup, instead of on the first search.'''
+        for command in self.commands:
+            command.pattern.precompile()
+        
+    # private
+    
+    async def _batch_match(self, string: str, commands: list[Command], objects_cache: ObjectsCache) -> list[tuple[Command, list[MatchResult]]]:
+        # find all matches first, then parse parameters of all of them together;
+        # objects parsed in this search are not reused between matches, but identical parse jobs run once
+        
+        pending = [(command, command.pattern._prepare_matches(string, objects_cache)) for command in commands]
+        jobs = [job for _, pending_matches in pending for pending_match in pending_matches for job in pending_match.jobs]
+        
+        await run_parse_jobs(jobs, objects_cache, deduplicate = True)
+        
+        return [(command, command.pattern._finish_matches(string, pending_matches)) for command, pending_matches in pending]
+    
+    async def _resolve_overlaps(self, string: str, results: list[SearchResult], objects_cache: ObjectsCache) -> list[SearchResult]:
+        # results must be sorted by start
+        
+        cuts: dict[tuple[int, int, int], list[MatchResult]] = {} # (pattern id, start, end) -> matches in the string slice
+        
+        async def cut(pattern: Pattern, start: int, end: int) -> list[MatchResult]:
+            key = (id(pattern), start, end)
+            if key in cuts:
+                return cuts[key]
+            
+            matches = await pattern.match(string[start:end], objects_cache) if string[start:end].strip() else []
+            for match in matches: # from slice to string positions
+                match.start += start
+                match.end += start
+            
+            cuts[key] = matches
+            return matches
+        
+        def overlap(prev: MatchResult, current: MatchResult) -> bool:
+            return prev.start == current.start or prev.end > current.start
+        
+        # run re-matches for all overlapping neighbours concurrently
+        
+        jobs: dict[tuple[int, int, int], tuple[Pattern, int, int]] = {}
+        for prev, current in zip(results, results[1:]):
+            if overlap(prev.match_result, current.match_result):
+                for pattern, start, end in [
+                    (prev.command.pattern, prev.match_result.start, current.match_result.start), # constrain prev end to current start
+                    (current.command.pattern, prev.match_result.end, current.match_result.end) # constrain current start to prev end
+                ]:
+                    jobs[(id(pattern), start, end)] = (pattern, start, end)
+        
+        if jobs:
+            async with create_task_group() as group:
+                for pattern, start, end in jobs.values():
+                    group.soonify(cut)(pattern, start, end)
+        
+        # sweep by start and resolve every result against the last kept one;
+        # previous decisions may change spans, so missing cuts are matched on demand
+        
+        kept: list[SearchResult] = []
+        
+        for current in results:
+            if not kept or not overlap(kept[-1].match_result, current.match_result):
+                kept.append(current)
+                continue
+            
+            prev = kept[-1]
+            prev_cut = await cut(prev.command.pattern, prev.match_result.start, current.match_result.start)
+            current_cut = await cut(current.command.pattern, prev.match_result.end, current.match_result.end)
+            
+            # less index = more priority to save full match
+            priority1, priority2 = (prev, current) if prev.index < current.index else (current, prev)
+            priority1_cut, priority2_cut = (prev_cut, current_cut) if prev.index < current.index else (current_cut, prev_cut)
+            
+            if new_matches := priority2_cut: # if can cut less priority
+                priority2.match_result = new_matches[0]
+            elif new_matches := priority1_cut: # else if can cut more priority
+                priority1.match_result = new_matches[0]
+            elif priority2 is current: # else remove less priority
+                continue
+            else:
+                kept.pop()
+                
+            kept.append(current)
+            
+        return kept
+    
+    def _filter_candidates(self, string: str, commands: list[Command]) -> list[Command]:
+        # rebuild lazily, only when searching after commands were changed
+        if not self._pattern_index or self._pattern_index_version != self.version:
+            self._indexed_commands = list(self.commands)
+            self._indexed_ids = {id(command) for command in self._indexed_commands}
+            self._pattern_index = PatternIndex([command.pattern for command in self._indexed_commands])
+            self._pattern_index_version = self.version
+            
+        candidates = {id(self._indexed_commands[i]) for i in self._pattern_index.candidates(string)}
+        
+        # commands out of the index (e.g. hidden context commands) are always candidates
+        return [command for command in commands if id(command) in candidates or id(command) not in self._indexed_ids]
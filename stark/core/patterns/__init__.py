@@ -1,2 +1,4 @@
 from . import expressions
 from .pattern import Pattern, MatchResult
+from .pattern_index import PatternIndex
+from .objects_cache import ObjectsCache
@@ -0,0 +1,148 @@
+from __future__ import annotations
+from typing import Any, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..types import Object
+
+
+_END = '' # trie node key for the insertion order of the substring ending at the node; chars are never empty
+
+class ObjectsCache(dict[str, 'Object']):
+    '''
+    Dict of parsed objects by substring with a trie index over the substrings.
+    Finds the first inserted substring contained in a string in O(len(string) * depth) instead of scanning all substrings.
+    '''
+
+    linear_scan_limit = 128 # for small caches the linear scan with C-level `in` is faster than walking the trie
+
+    _trie: dict[str, Any]
+    _orders: dict[str, int] # substring -> insertion order
+    _substrings: dict[int, str] # insertion order -> substring
+    _counter: int
+
+    def __init__(self, objects: dict[str, Object] | Iterable[tuple[str, Object]] = (), /):
+        super().__init__()
+        self._trie = {}
+        self._orders = {}
+        self._substrings = {}
+        self._counter = 0
+        self.update(objects)
+
+    def find_contained(self, string: str) -> tuple[str, Object] | None:
+        '''Returns the first inserted (substring, object) pair where the substring is contained in the string.'''
+
+        if len(self) <= self.linear_scan_limit:
+            return _linear_find_contained(self, string)
+
+        best: int | None = self._trie.get(_END) # empty substring is contained in any string
+        length = len(string)
+
+        for start in range(length):
+            node = self._trie
+            for i in range(start, length):
+                next_node: dict[str, Any] | None = node.get(string[i])
+                if next_node is None:
+                    break
+                node = next_node
+                order = node.get(_END)
+                if order is not None and (best is None or order < best):
+                    best = order
+
+        if best is None:
+            return None
+
+        substring = self._substrings[best]
+        return substring, self[substring]
+
+    # dict
+
+    def __setitem__(self, substring: str, obj: Object):
+        if substring not in self:
+            self._index(substring)
+        super().__setitem__(substring, obj)
+
+    def __delitem__(self, substring: str):
+        super().__delitem__(substring)
+        self._unindex(substring)
+
+    def update(self, objects: Any = (), /, **kwobjects: Object): # type: ignore[override]
+        for substring, obj in dict(objects, **kwobjects).items():
+            self[substring] = obj
+
+    def setdefault(self, substring: str, obj: Object | None = None) -> Object: # type: ignore[override]
+        if substring not in self:
+            self[substring] = obj # type: ignore[assignment]
+        return self[substring]
+
+    def pop(self, substring: str, *default: Any) -> Any: # type: ignore[override]
+        if substring not in self:
+            return super().pop(substring, *default)
+        obj = self[substring]
+        del self[substring]
+        return obj
+
+    def popitem(self) -> tuple[str, Object]:
+        substring, obj = super().popitem()
+        self._unindex(substring)
+        return substring, obj
+
+    def __or__(self, objects: Any) -> ObjectsCache: # type: ignore[override]
+        if not isinstance(objects, dict):
+            return NotImplemented
+        cache = self.copy()
+        cache.update(objects)
+        return cache
+
+    def __ior__(self, objects: Any) -> ObjectsCache: # type: ignore[override]
+        self.update(objects)
+        return self
+
+    def copy(self) -> ObjectsCache:
+        cache = type(self)(self)
+        cache.linear_scan_limit = self.linear_scan_limit
+        return cache
+
+    @classmethod
+    def fromkeys(cls, substrings: Iterable[str], obj: Object | None = None) -> ObjectsCache: # type: ignore[override]
+        cache = cls()
+        for substring in substrings:
+            cache[substring] = obj # type: ignore[assignment]
+        return cache
+
+    def clear(self):
+        super().clear()
+        self._trie.clear()
+        self._orders.clear()
+        self._substrings.clear()
+
+    # private
+
+    def _index(self, substring: str):
+        node = self._trie
+        for char in substring:
+            node = node.setdefault(char, {})
+        node[_END] = self._counter
+        self._orders[substring] = self._counter
+        self._substrings[self._counter] = substring
+        self._counter += 1
+
+    def _unindex(self, substring: str):
+        node = self._trie
+        for char in substring:
+            node = node[char]
+        del node[_END]
+        del self._substrings[self._orders.pop(substring)]
+
+def find_contained(objects_cache: dict[str, Object], string: str) -> tuple[str, Object] | None:
+    '''Returns the first (substring, object) pair of the cache where the substring is contained in the string.'''
+
+    if isinstance(objects_cache, ObjectsCache):
+        return objects_cache.find_contained(string)
+
+    return _linear_find_contained(objects_cache, string)
+
+def _linear_find_contained(objects_cache: dict[str, Object], string: str) -> tuple[str, Object] | None:
+    for parsed_substr, parsed_obj in objects_cache.items():
+        if parsed_substr in string:
+            return parsed_substr, parsed_obj
+    return None
@@ -1,16 +1,19 @@
 from __future__ import annotations
-from typing import Type, Generator, TypeAlias, TYPE_CHECKING
-from dataclasses import dataclass
+from typing import Type, Generator, TypeAlias, TYPE_CHECKING, cast
+from dataclasses import dataclass, field
 import re
-from asyncer import create_task_group, SoonValue
+from asyncer import create_task_group
 import json
 
 from .expressions import dictionary
+from .objects_cache import ObjectsCache, find_contained
 if TYPE_CHECKING:
     from ..types import Object, ParseResult
     ObjectType: TypeAlias = Type[Object]
 
 
+_compiled_dictionary = [(re.compile(pattern_re), regex) for pattern_re, regex in dictionary.items()]
+
 @dataclass
 class MatchResult:
     substring: str
@@ -18,102 +21,123 @@ class MatchResult:
     end: int
     parameters: dict[str, Object]
 
+@dataclass
+class ParseJob:
+    name: str
+    object_type: ObjectType
+    from_string: str
+    parameters: dict[str, str] # own copy of match groups, parsing pops nested parameters
+    result: ParseResult | None = None
+    
+    @property
+    def key(self) -> tuple:
+        nested_parameters = tuple((name, self.parameters.get(name)) for name in self.object_type.pattern.parameters)
+        return (self.object_type, self.from_string, nested_parameters)
+    
+    async def run(self, objects_cache: dict[str, Object]):
+        self.result = await self.object_type.parse(from_string = self.from_string, parameters = self.parameters)
+        objects_cache[self.result.substring] = self.result.obj
+
+@dataclass
+class PendingMatch:
+    match: re.Match
+    parameters: dict[str, Object] = field(default_factory = dict) # found in cache
+    substrings: dict[str, str] = field(default_factory = dict)
+    jobs: list[ParseJob] = field(default_factory = list) # not found in cache
+
+async def run_parse_jobs(jobs: list[ParseJob], objects_cache: dict[str, Object], deduplicate: bool = False):
+    
+    if deduplicate: # run only the first of identical jobs, others get copies of its result
+        unique: dict[tuple, ParseJob] = {}
+        duplicates: list[tuple[ParseJob, ParseJob]] = []
+        for job in jobs:
+            if (original := unique.setdefault(job.key, job)) is not job:
+                duplicates.append((job, original))
+        jobs = list(unique.values())
+    
+    # task group only if there is something to run concurrently
+    if len(jobs) == 1:
+        await jobs[0].run(objects_cache)
+    elif jobs:
+        async with create_task_group() as group:
+            for job in jobs:
+                group.soonify(job.run)(objects_cache)
+                
+    if deduplicate:
+        for job, original in duplicates:
+            original_result = cast('ParseResult', original.result)
+            job.result = type(original_result)(original_result.obj.copy(), original_result.substring)
+
 class Pattern:
     
     parameters: dict[str, ObjectType]
     compiled: str
+    literals: frozenset[str] # substrings that every match must contain
     
     _origin: str
+    _regex: re.Pattern | None = None
     _parameter_regex: re.Pattern
     _parameter_types: dict[str, ObjectType] = {} # static
+    _cache: dict[str, Pattern] = {} # static, interned patterns by origin
+
+    def __new__(cls, origin: str):
+        # identical patterns are compiled once and shared
+        if cached := cls._cache.get(origin):
+            return cached
+        return super().__new__(cls)
 
     def __init__(self, origin: str):
+        if Pattern._cache.get(origin) is self:
+            return # interned instance is already initialized
+        
         self._origin = origin
         self._parameter_regex = self._get_parameter_regex()
         self.parameters = dict(self._get_parameters())
         self.compiled = self._compile()
+        self.literals = self._get_literals()
+        Pattern._cache[origin] = self
+        
+    @property
+    def regex(self) -> re.Pattern:
+        '''Compiled regex, lazily compiled on the first use.'''
+        if self._regex is None:
+            self.precompile()
+        return cast(re.Pattern, self._regex)
+    
+    def precompile(self):
+        '''Compile regex eagerly, e.g. at startup, instead of on the first match.'''
+        self._regex = re.compile(self.compiled)
+        
+    def could_match(self, string: str) -> bool:
+        '''Cheap check that the string contains all required literals. False means the pattern can't match the string.'''
+        return all(literal in string for literal in self.literals)
         
     async def match(self, string: str, objects_cache: dict[str, Object] | None = None) -> list[MatchResult]:
         
+        if not self.could_match(string):
+            return []
+        
         if objects_cache is None:
-            objects_cache = {}
+            objects_cache = ObjectsCache()
             
         matches: list[MatchResult] = []
         
-        for match in sorted(re.finditer(self.compiled, string), key = lambda match: match.start()):
-            
-            if match.start() == match.end():
-                continue # skip empty
-            
-            # start and end in string, not in match.group(0) 
-            match_start = match.start()
-            match_end = match.end()
-            match_str_groups = match.groupdict()
-            
-            # parse parameters
+        for match in self._find(string):
+            # one by one, so parsed objects of previous matches are available in the cache
+            pending = self._prepare_match(match, objects_cache)
+            await run_parse_jobs(pending.jobs, objects_cache)
+            matches.append(self._finish_match(string, pending))
             
-            parameters: dict[str, Object] = {}
-            substrings: dict[str, str] = {}
-            futures: list[tuple[str, SoonValue[ParseResult]]] = []
-            
-            # run concurrent objects parsing
-            async with create_task_group() as group:
-                for name, object_type in self.parameters.items():
-                    if not match_str_groups.get(name):
-                        continue
-                    
-                    parameter_str = match_str_groups[name].strip()
-                    
-                    for parsed_substr, parsed_obj in objects_cache.items():
-                        if parsed_substr in parameter_str:
-                            parameters[name] = parsed_obj.copy()
-                            parameter_str = parsed_substr
-                            substrings[name] = parsed_substr
-                            break
-                    else:
-                        async def parse(from_string: str, parameters: dict[str, str]):
-                            parse_result = await object_type.parse(from_string = from_string, parameters = parameters)
-                            objects_cache[parse_result.substring] = parse_result.obj
-                            return parse_result
-                        futures.append((name, group.soonify(parse)(parameter_str, match_str_groups)))
-            
-            # read futures
-            for name, future in futures:
-                parse_result = future.value
-                parameters[name] = parse_result.obj
-                substrings[name] = parse_result.substring
-                
-            # save parameters
-            for name in parameters.keys():
-                parameter_str = substrings[name]
-                parameter_start = match_str_groups[name].find(parameter_str)
-                parameter_end = parameter_start + len(parameter_str)
-                
-                # adjust start, end and substring after parsing parameters
-                if match.start(name) == match.start() and parameter_start != 0:
-                    match_start = match.start(name) + parameter_start
-                if match.end(name) == match.end() and parameter_end != len(parameter_str):
-                    match_end = match.start(name) + parameter_start + parameter_end 
-                    
-            # strip original string
-            substring = string[match_start:match_end].strip()
-            start = match_start + string[match_start:match_end].find(substring)
-            end = start + len(substring)
-            
-            matches.append(MatchResult(
-                substring = substring,
-                start = start,
-                end = end,
-                parameters = parameters
-            ))
-            
-        # filter overlapping matches
-        
-        for prev, current in zip(matches.copy(), matches[1:]): # copy to prevent affecting iteration by removing items; slice makes copy automatically
-            if prev.start == current.start or prev.end > current.start: # if overlap 
-                matches.remove(min(prev, current, key = lambda m: len(m.substring))) # remove shorter
-            
-        return sorted(matches, key = lambda m: len(m.substring), reverse = True)
+        return self._filter_overlapping(matches)
+    
+    def _prepare_matches(self, string: str, objects_cache: dict[str, Object]) -> list[PendingMatch]:
+        # for batch parsing: collect parse jobs of all matches to run them together
+        if not self.could_match(string):
+            return []
+        return [self._prepare_match(match, objects_cache) for match in self._find(string)]
+    
+    def _finish_matches(self, string: str, pending_matches: list[PendingMatch]) -> list[MatchResult]:
+        return self._filter_overlapping([self._finish_match(string, pending) for pending in pending_matches])
     
     @classmethod
     def add_parameter_type(cls, object_type: ObjectType):
@@ -123,8 +147,88 @@ class Pattern:
         assert exists_type in {object_type, None}, f'Can`t add parameter type: {object_type.__name__} already exists'
         cls._parameter_types[object_type.__name__] = object_type
         
+        if not exists_type:
+            cls._cache.clear() # cached patterns depend on the set of registered types
+        
     # private
     
+    def _find(self, string: str) -> list[re.Match]:
+        return [
+            match for match in sorted(self.regex.finditer(string), key = lambda match: match.start())
+            if match.start() != match.end() # skip empty
+        ]
+    
+    def _prepare_match(self, match: re.Match, objects_cache: dict[str, Object]) -> PendingMatch:
+        match_str_groups = match.groupdict()
+        pending = PendingMatch(match = match)
+            
+        for name, object_type in self.parameters.items():
+            if not match_str_groups.get(name):
+                continue
+            
+            parameter_str = match_str_groups[name].strip()
+            
+            if cached := find_contained(objects_cache, parameter_str):
+                parsed_substr, parsed_obj = cached
+                pending.parameters[name] = parsed_obj.copy()
+                pending.substrings[name] = parsed_substr
+            else:
+                pending.jobs.append(ParseJob(name, object_type, parameter_str, dict(match_str_groups)))
+                
+        return pending
+    
+    def _finish_match(self, string: str, pending: PendingMatch) -> MatchResult:
+        match = pending.match
+        match_str_groups = match.groupdict()
+        parameters = pending.parameters
+        substrings = pending.substrings
+        
+        # start and end in string, not in match.group(0) 
+        match_start = match.start()
+        match_end = match.end()
+        
+        # read parse results
+        for job in pending.jobs:
+            parse_result = cast('ParseResult', job.result)
+            parameters[job.name] = parse_result.obj
+            substrings[job.name] = parse_result.substring
+            
+        # save parameters
+        for name in parameters.keys():
+            parameter_str = substrings[name]
+            parameter_start = match_str_groups[name].find(parameter_str)
+            parameter_end = parameter_start + len(parameter_str)
+            
+            # adjust start, end and substring after parsing parameters
+            if match.start(name) == match.start() and parameter_start != 0:
+                match_start = match.start(name) + parameter_start
+            if match.end(name) == match.end() and parameter_end != len(parameter_str):
+                match_end = match.start(name) + parameter_start + parameter_end 
+                
+        # strip original string
+        substring = string[match_start:match_end].strip()
+        start = match_start + string[match_start:match_end].find(substring)
+        end = start + len(substring)
+        
+        return MatchResult(
+            substring = substring,
+            start = start,
+            end = end,
+            parameters = parameters
+        )
+        
+    def _filter_overlapping(self, matches: list[MatchResult]) -> list[MatchResult]:
+        removed = [False] * len(matches)
+        
+        for i in range(1, len(matches)):
+            prev, current = matches[i - 1], matches[i]
+            if prev.start == current.start or prev.end > current.start: # if overlap 
+                removed[i - 1 if len(prev.substring) <= len(current.substring) else i] = True # remove shorter, prev if equal
+                
+        matches = [match for match, is_removed in zip(matches, removed) if not is_removed]
+            
+        return sorted(matches, key = lambda m: len(m.substring), reverse = True)
+    
     def _get_parameter_regex(self) -> re.Pattern:
         # types = '|'.join(Pattern._parameter_types.keys())
         # return re.compile(r'\$(?P<name>[A-z][A-z0-9]*)\:(?P<type>(?:' + types + r'))')
@@ -132,7 +236,7 @@ class Pattern:
         return re.compile(r'\$(?P<name>[A-z][A-z0-9]*)\:(?P<type>[A-z][A-z0-9]*)')
     
     def _get_parameters(self) -> Generator[tuple[str, ObjectType], None, None]:
-        for match in re.finditer(self._parameter_regex, self._origin):
+        for match in self._parameter_regex.finditer(self._origin):
             arg_name = match.group('name')
             arg_type_name = match.group('type')
             arg_type: ObjectType | None = Pattern._parameter_types.get(arg_type_name)
@@ -148,19 +252,60 @@ class Pattern:
 
         #   transform core expressions to regex
         
-        for pattern_re, regex in dictionary.items():
-            pattern = re.sub(pattern_re, regex, pattern)
+        for pattern_re, regex in _compiled_dictionary:
+            pattern = pattern_re.sub(regex, pattern)
 
         #   find and transform parameters like $name:Type
         
         for name, object_type in self.parameters.items():
             
-            arg_declaration = f'\\${name}\\:{object_type.__name__}'
-            arg_pattern = object_type.pattern.compiled.replace('\\', r'\\')
-            pattern = re.sub(arg_declaration, f'(?P<{name}>{arg_pattern})', pattern)
+            # plain replace instead of re.sub doesn't need escaping and skips the re module cache
+            arg_declaration = f'${name}:{object_type.__name__}'
+            arg_pattern = object_type.pattern.compiled
+            pattern = pattern.replace(arg_declaration, f'(?P<{name}>{arg_pattern})')
         
         return pattern
     
+    def _get_literals(self) -> frozenset[str]: # find fixed words outside of any groups and wildcards
+        
+        origin = self._parameter_regex.sub('.', self._origin) # parameters are not literal
+        
+        if '\\' in origin or '(?' in origin:
+            return frozenset() # escapes and regex extensions are too complex to analyze, skip prefiltering
+        
+        literals: set[str] = set()
+        current = ''
+        depth = 0
+        
+        for i, char in enumerate(origin):
+            if char in '([{':
+                if depth == 0 and char == '{' and re.match(r'\{\d*,?\d*\}', origin[i:]):
+                    current = current[:-1] # quantifier like {0,2} may make the previous char optional
+                depth += 1
+            elif char in ')]}':
+                depth -= 1
+                if depth < 0:
+                    return frozenset()
+            elif depth:
+                continue
+            elif char == '|':
+                return frozenset() # top level alternation makes every literal optional
+            elif char == '?':
+                current = current[:-1] # optional previous char
+            elif char not in '*+.^$' and not char.isspace():
+                current += char
+                continue
+            
+            # any non-literal char splits the literal
+            if current:
+                literals.add(current)
+            current = ''
+            
+        if current:
+            literals.add(current)
+            
+        return frozenset(literals)
+    
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Pattern):
             raise NotImplementedError(f'Can`t compare Pattern with {type(other)}')
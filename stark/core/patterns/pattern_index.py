@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Sequence
+
+from .pattern import Pattern
+
+
+class PatternIndex:
+    '''
+    Groups patterns by their longest required literal, so a literal shared by many patterns is looked up in the string only once,
+    and the rest of literals are checked only for patterns whose key literal is found. Patterns without literals are always candidates.
+    '''
+
+    patterns: list[Pattern]
+
+    _buckets: dict[str, list[int]] # key literal -> pattern indexes
+    _unindexed: set[int] # patterns without literals
+
+    def __init__(self, patterns: Sequence[Pattern]):
+        self.patterns = list(patterns)
+        self._buckets = {}
+        self._unindexed = set()
+
+        for i, pattern in enumerate(self.patterns):
+            if not pattern.literals:
+                self._unindexed.add(i)
+                continue
+            key = max(pattern.literals, key = lambda literal: (len(literal), literal)) # the longest is the most selective
+            self._buckets.setdefault(key, []).append(i)
+
+    def candidates(self, string: str) -> set[int]:
+        '''Returns indexes of patterns that can match the string.'''
+
+        candidates = set(self._unindexed)
+
+        for literal, indexes in self._buckets.items():
+            if literal in string:
+                candidates.update(i for i in indexes if self.patterns[i].could_match(string))
+
+        return candidates
@@ -5,6 +5,7 @@ from abc import ABC
 import copy
 
 from stark.general.classproperty import classproperty
+from stark.general.cache import LRUCache
 from .. import Pattern
 
 
@@ -17,6 +18,11 @@ class Object(ABC):
 
     value: Any
     
+    cache_parsing: bool = False # reuse parse results across searches; enable only if parsing doesn't depend on anything except the string, not inherited
+    parse_cache_size: int = 1024
+    parse_cache_ttl: float | None = None # seconds
+    _parse_cache: LRUCache # per subclass, see _get_parse_cache
+    
     @classproperty
     def pattern(cls) -> Pattern:
         return Pattern('**')
@@ -55,6 +61,17 @@ class Object(ABC):
         obj = cls(None)
         parameters = parameters or {}
         
+        cache_parsing = cls.__dict__.get('cache_parsing', False) # opt-in per class, subclasses may parse differently
+        
+        if cache_parsing:
+            nested_parameters = tuple(cls._pop_nested_parameters(dict(parameters)))
+            cache_key = (from_string, nested_parameters)
+            
+            if cached := cls._get_parse_cache().get(cache_key):
+                for name, _ in nested_parameters: # as if all nested objects were parsed
+                    parameters.pop(name)
+                return ParseResult(copy.deepcopy(cached.obj), cached.substring)
+        
         for name, object_type in cls.pattern.parameters.items():
             if not parameters.get(name):
                 continue
@@ -63,8 +80,30 @@ class Object(ABC):
         
         substring = await obj.did_parse(from_string)
         
+        if cache_parsing:
+            cls._get_parse_cache().set(cache_key, ParseResult(copy.deepcopy(obj), substring))
+        
         return ParseResult(obj, substring)
     
+    @classmethod
+    def _pop_nested_parameters(cls, parameters: dict[str, str]) -> list[tuple[str, str]]:
+        # pops parameters of all nested levels the same way as parsing does
+        popped = []
+        for name, object_type in cls.pattern.parameters.items():
+            if not parameters.get(name):
+                continue
+            popped.append((name, parameters.pop(name)))
+            popped.extend(object_type._pop_nested_parameters(parameters))
+        return popped
+    
+    @classmethod
+    def _get_parse_cache(cls) -> LRUCache[tuple[str, tuple[tuple[str, str], ...]], ParseResult]:
+        # each subclass has its own cache, so it must not be inherited
+        if (cache := cls.__dict__.get('_parse_cache')) is None:
+            cache = LRUCache(maxsize = cls.parse_cache_size, ttl = cls.parse_cache_ttl)
+            cls._parse_cache = cache
+        return cache
+    
     def copy(self) -> Object:
         return copy.copy(self)
     
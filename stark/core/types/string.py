@@ -2,4 +2,5 @@ from .object import Object
 
 
 class String(Object):
-    value: str
\ No newline at end of file
+    value: str
+    cache_parsing = True
\ No newline at end of file
@@ -3,6 +3,7 @@ from .object import Object, Pattern, classproperty
 
 class Word(Object):
     value: str
+    cache_parsing = True
 
     @classproperty
     def pattern(cls) -> Pattern:
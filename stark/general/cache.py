@@ -0,0 +1,63 @@
+from __future__ import annotations
+from typing import Generic, Hashable, TypeVar
+from collections import OrderedDict
+import time
+
+
+K = TypeVar('K', bound = Hashable)
+V = TypeVar('V')
+
+class LRUCache(Generic[K, V]):
+    '''Size limited cache that evicts the least recently used entries. Entries older than `ttl` seconds are expired.'''
+
+    maxsize: int
+    ttl: float | None
+    hits: int
+    misses: int
+
+    _data: OrderedDict[K, tuple[float, V]] # key -> (creation time, value)
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = None):
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        created, value = entry
+
+        if self.ttl is not None and time.monotonic() - created >= self.ttl:
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last = False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __repr__(self) -> str:
+        return f'<LRUCache {len(self)}/{self.maxsize} hits: {self.hits} misses: {self.misses}>'
@@ -1,12 +1,25 @@
-from typing import Callable, Any
+from typing import Callable, Any, Hashable
 from dataclasses import dataclass
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from enum import auto, Enum
+from weakref import WeakKeyDictionary
+import inspect
 
+import anyio
+
+
+class DependencyScope(Enum):
+    singleton = auto() # created once, lives until DependencyManager.close()
+    utterance = auto() # shared by all commands of one processed string
+    command = auto() # created for every command run
 
 @dataclass
 class Dependency:
     name: str | None
     annotation: type | None
     value: Any
+    factory: Callable | None = None # provider: creates the value on first resolve
+    scope: DependencyScope = DependencyScope.singleton
     
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Dependency):
@@ -16,36 +29,159 @@ class Dependency:
     def __hash__(self):
         return hash((self.name, self.annotation))
 
+class ScopedDependencies:
+    '''Values created by providers within one scope. They are torn down together when the scope ends.'''
+    
+    _values: dict[Dependency, Any]
+    _exit_stack: AsyncExitStack
+    _lock: anyio.Lock
+    _users: int
+    
+    def __init__(self):
+        self._values = {}
+        self._exit_stack = AsyncExitStack()
+        self._lock = anyio.Lock()
+        self._users = 0
+        
+    def peek(self, dependency: Dependency) -> Any | None:
+        return self._values.get(dependency)
+        
+    async def get(self, dependency: Dependency) -> Any:
+        async with self._lock: # prevent creating the same value concurrently
+            if dependency not in self._values:
+                self._values[dependency] = await self._create(dependency.factory)
+            return self._values[dependency]
+        
+    def retain(self):
+        self._users += 1
+        
+    async def release(self):
+        self._users -= 1
+        if self._users <= 0:
+            await self.close()
+        
+    async def close(self):
+        self._values.clear()
+        await self._exit_stack.aclose()
+        self._exit_stack = AsyncExitStack()
+        
+    # private
+    
+    async def _create(self, factory: Callable | None) -> Any:
+        assert factory
+        
+        # generators are teardown-able: the code after yield runs when the scope ends
+        if inspect.isasyncgenfunction(factory):
+            return await self._exit_stack.enter_async_context(asynccontextmanager(factory)())
+        if inspect.isgeneratorfunction(factory):
+            return self._exit_stack.enter_context(contextmanager(factory)())
+        
+        value = factory()
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
 class DependencyManager:
     
     dependencies: set[Dependency]
     
+    _by_name_and_annotation: dict[tuple[str | None, Hashable], Dependency]
+    _by_annotation: dict[Hashable, Dependency] # dependencies without name
+    _plans: WeakKeyDictionary[Callable, list[tuple[str, Dependency]]] # func -> (parameter name, dependency)
+    _singletons: ScopedDependencies
+    
     def __init__(self):
         self.dependencies = set()
+        self._by_name_and_annotation = {}
+        self._by_annotation = {}
+        self._plans = WeakKeyDictionary()
+        self._singletons = ScopedDependencies()
         
     def find(self, name: str | None, annotation: type | None) -> Dependency | None:
-        for dependency in self.dependencies:
-            name_match = name == dependency.name
-            annotation_match = annotation == dependency.annotation
-            if (not dependency.name or name_match) and annotation_match:
-                return dependency
-        return None
+        try:
+            # dependency with the same name is more specific than the one matching by annotation only
+            return self._by_name_and_annotation.get((name, annotation)) or self._by_annotation.get(annotation)
+        except TypeError: # unhashable annotation
+            return None
     
     def resolve(self, func: Callable) -> dict[str, Any]:
+        '''Resolves values and already created singletons of providers. Use `resolve_providers` to create provided values.'''
         parameters = {}
         
-        annotations = {name: None for name in func.__code__.co_varnames}
-        annotations.update(func.__annotations__)
-        
-        for name, annotation in annotations.items():
-            if dependency := self.find(name, annotation):
+        for name, dependency in self._get_plan(func):
+            if not dependency.factory:
                 parameters[name] = dependency.value
-
+            elif dependency.scope == DependencyScope.singleton and (value := self._singletons.peek(dependency)) is not None:
+                parameters[name] = value
+                
+        return parameters
+    
+    async def resolve_providers(self, func: Callable, command_scope: ScopedDependencies, utterance_scope: ScopedDependencies | None = None) -> dict[str, Any]:
+        '''Resolves providers only, creating their values on the first use in the scope. Without utterance scope, the command is its own utterance.'''
+        parameters = {}
+        
+        scopes = {
+            DependencyScope.singleton: self._singletons,
+            DependencyScope.utterance: utterance_scope or command_scope,
+            DependencyScope.command: command_scope,
+        }
+        
+        for name, dependency in self._get_plan(func):
+            if dependency.factory:
+                parameters[name] = await scopes[dependency.scope].get(dependency)
+                
         return parameters
         
     def add_dependency(self, name: str | None, annotation: type | None, value: Any):
         assert (name or annotation) and value
-        self.dependencies.add(Dependency(name, annotation, value))
+        self._add(Dependency(name, annotation, value))
+        
+    def add_provider(self, name: str | None, annotation: type | None, factory: Callable, scope: DependencyScope = DependencyScope.singleton):
+        '''
+        Adds a dependency that is created lazily by the factory on the first resolve within the scope.
+        Factory can be a sync or async function, or a sync or async generator that yields the value and cleans up after yield when the scope ends.
+        '''
+        assert (name or annotation) and callable(factory)
+        self._add(Dependency(name, annotation, None, factory, scope))
+        
+    async def close(self):
+        '''Tears down singletons created by providers.'''
+        await self._singletons.close()
+        
+    # private
+    
+    def _add(self, dependency: Dependency):
+        name, annotation = dependency.name, dependency.annotation
+        
+        if dependency in self.dependencies:
+            return # like set.add, keep the existing one
+        
+        self.dependencies.add(dependency)
+        self._by_name_and_annotation[(name, annotation)] = dependency
+        if not name:
+            self._by_annotation[annotation] = dependency
+            
+        self._plans.clear()
+    
+    def _get_plan(self, func: Callable) -> list[tuple[str, Dependency]]:
+        try:
+            if (plan := self._plans.get(func)) is not None:
+                return plan
+        except TypeError: # not weak referenceable, e.g. some builtins
+            return self._make_plan(func)
+            
+        plan = self._make_plan(func)
+        self._plans[func] = plan
+        return plan
+    
+    def _make_plan(self, func: Callable) -> list[tuple[str, Dependency]]:
+        annotations = {name: None for name in func.__code__.co_varnames}
+        annotations.update(func.__annotations__)
+        
+        return [
+            (name, dependency) for name, annotation in annotations.items()
+            if (dependency := self.find(name, annotation))
+        ]
                 
 default_dependency_manager = DependencyManager()
 default_dependency_manager.add_dependency(None, DependencyManager, default_dependency_manager)
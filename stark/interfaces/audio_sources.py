@@ -0,0 +1,68 @@
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Protocol, runtime_checkable
+import wave
+import anyio
+
+
+@runtime_checkable
+class AudioSource(Protocol):
+    '''Async iterator of raw 16-bit mono PCM chunks, e.g. recorded audio for offline transcription.'''
+
+    samplerate: int
+
+    def __aiter__(self) -> AsyncIterator[bytes]: pass
+
+class WavFileSource:
+    '''Reads a 16-bit mono WAV file in large chunks.'''
+
+    samplerate: int
+    chunk_size: int # frames
+
+    _path: str
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        with wave.open(path, 'rb') as wav:
+            assert wav.getsampwidth() == 2 and wav.getnchannels() == 1, f'WAV file "{path}" must be 16-bit mono PCM'
+            self.samplerate = wav.getframerate()
+        self._path = path
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        wav = wave.open(self._path, 'rb')
+        try:
+            while data := await anyio.to_thread.run_sync(wav.readframes, self.chunk_size):
+                yield data
+        finally:
+            wav.close()
+
+class RawFileSource:
+    '''Reads raw 16-bit mono PCM from a binary file object, e.g. `sys.stdin.buffer` or a pipe.'''
+
+    samplerate: int
+    chunk_size: int # bytes
+
+    _file: BinaryIO
+
+    def __init__(self, file: BinaryIO, samplerate: int, chunk_size: int = 65536):
+        self._file = file
+        self.samplerate = samplerate
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while data := await anyio.to_thread.run_sync(self._file.read, self.chunk_size):
+            yield data
+
+class RawStreamSource:
+    '''Raw 16-bit mono PCM from any async byte iterable, e.g. an anyio socket stream.'''
+
+    samplerate: int
+
+    _stream: AsyncIterable[bytes]
+
+    def __init__(self, stream: AsyncIterable[bytes], samplerate: int):
+        self._stream = stream
+        self.samplerate = samplerate
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for data in self._stream:
+            if data:
+                yield data
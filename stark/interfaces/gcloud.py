@@ -1,30 +1,35 @@
 import os
+import io
+import numpy
 from google.cloud import texttospeech
 import sounddevice
 import soundfile
 import asyncer
-from .protocols import SpeechSynthesizer, SpeechSynthesizerResult
+from .protocols import SpeechSynthesizer, SpeechSynthesizerResult, SpeechSynthesizerAudioResult
+from .speech_cache import CachedSpeechSynthesizer
 
-class Speech(SpeechSynthesizerResult):
+class Speech(SpeechSynthesizerAudioResult):
 
-    def __init__(self, text, voice, path):
-        self.text = text
-        self.voice = voice
-        self.path = path
+    def __init__(self, audio: numpy.ndarray, sample_rate: int):
+        self.audio = audio
+        self.sample_rate = sample_rate
 
-    def play(self):
-        try:
-            sounddevice.play(*soundfile.read(self.path, dtype='float32'))
-            sounddevice.wait()
-        except Exception as e:
-            print('\n[Error] Can`t play audio file\n', e)
+    async def play(self):
+        if not self.audio.size:
+            return # synthesis failed
+        play_async = asyncer.asyncify(sounddevice.play)
+        await play_async(self.audio, self.sample_rate, blocking = True)
 
     def stop(self):
-        pass
+        sounddevice.stop()
 
 class GCloudSpeechSynthesizer(SpeechSynthesizer):
+    '''Caches synthesized audio in `cache_directory` (see `CachedSpeechSynthesizer`), so repeated responses aren't requested again. `None` disables the cache.'''
+    
+    sample_rate: int | None = None # voice default
+    cache: CachedSpeechSynthesizer | None
     
-    def __init__(self, voice_name: str, language_code: str, json_key_path: str):
+    def __init__(self, voice_name: str, language_code: str, json_key_path: str, cache_directory: str | None = 'audio/gcloud'):
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = json_key_path
         self._client       = texttospeech.TextToSpeechClient()
         self._audio_config = texttospeech.AudioConfig(audio_encoding = texttospeech.AudioEncoding.LINEAR16)
@@ -35,43 +40,45 @@ class GCloudSpeechSynthesizer(SpeechSynthesizer):
             name           = self._name,
             ssml_gender    = texttospeech.SsmlVoiceGender.FEMALE
         )
+        self.cache = CachedSpeechSynthesizer(_GCloudRequests(self), cache_directory) if cache_directory else None
+        
+    @property
+    def voice(self) -> str:
+        return self._name
 
-    async def synthesize(self, text) -> Speech:
-        folder = f'audio/{self._name}'
-        path = f'{folder}/{self._transliterate(text)[:100]}.wav'
-
-        if os.path.exists(path):
-            return Speech(text, self._name, path)
-
+    async def synthesize(self, text) -> SpeechSynthesizerResult:
+        if self.cache:
+            return await self.cache.synthesize(text)
+        return await self._request(text)
+    
+    # private
+    
+    async def _request(self, text: str) -> Speech:
         synthesis_input = texttospeech.SynthesisInput(text = text)
 
         try:
             synthesize_speech_async = asyncer.asyncify(self._client.synthesize_speech)
             response = await synthesize_speech_async(input = synthesis_input, voice = self._voice, audio_config = self._audio_config)
-            if not os.path.exists(folder): 
-                os.makedirs(folder)
-            with open(path, 'wb') as out:
-                out.write(response.audio_content)
+            # LINEAR16 audio content is a WAV file
+            audio, sample_rate = soundfile.read(io.BytesIO(response.audio_content), dtype = 'float32')
+            return Speech(audio, sample_rate)
         except Exception as e:
             print("\n[ERROR] TTS Error: google cloud tts response error. Check Cloud Platform Console\n", e)
-
-        return Speech(text, self._name, path)
+            return Speech(numpy.zeros(0, dtype = 'float32'), 0)
+        
+class _GCloudRequests(SpeechSynthesizer):
+    '''Uncached requests of the synthesizer, wrapped by its cache.'''
+    
+    def __init__(self, synthesizer: GCloudSpeechSynthesizer):
+        self._synthesizer = synthesizer
+        
+    @property
+    def voice(self) -> str:
+        return self._synthesizer.voice
     
-    @staticmethod
-    def _transliterate(name):
-        dict = {'а':'a','б':'b','в':'v','г':'g','д':'d','е':'e','ё':'e',
-          'ж':'zh','з':'z','и':'i','й':'i','к':'k','л':'l','м':'m','н':'n',
-          'о':'o','п':'p','р':'r','с':'s','т':'t','у':'u','ф':'f','х':'h',
-          'ц':'c','ч':'ch','ш':'sh','щ':'sch','ы':'y','э':'e',
-          'ю':'u','я':'ja', ' ':'_'}
-        allowed = 'abcdefghijklmnopqrstuvxyz'
-        name = name.lower()
-        for i, letter in enumerate(name):
-            if letter in allowed: 
-                continue;
-            elif letter in dict.keys():
-                name = name.replace(letter, dict[letter])
-            else:
-                name = name.replace(letter, '')
-        return name
+    @property
+    def sample_rate(self) -> int | None:
+        return self._synthesizer.sample_rate
 
+    async def synthesize(self, text: str) -> Speech:
+        return await self._synthesizer._request(text)
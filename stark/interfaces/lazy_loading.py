@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+import anyio
+
+from .protocols import LazyLoading
+
+
+class LazyLoader(LazyLoading, ABC):
+    '''Loads heavy models in a worker thread on `load()` or on the first use, so they don't block startup.'''
+
+    is_ready = False
+
+    _load_lock: anyio.Lock | None = None
+
+    async def load(self):
+        if self.is_ready: return
+
+        if not self._load_lock:
+            self._load_lock = anyio.Lock()
+
+        async with self._load_lock: # concurrent calls wait for the same loading
+            if self.is_ready: return
+            await anyio.to_thread.run_sync(self._load)
+            self.is_ready = True
+
+    def load_sync(self):
+        if not self.is_ready:
+            self._load()
+            self.is_ready = True
+
+    # private
+
+    @abstractmethod
+    def _load(self):
+        '''Blocking loading of models, runs in a worker thread.'''
+        pass
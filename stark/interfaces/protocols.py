@@ -1,6 +1,12 @@
-from typing import Protocol, runtime_checkable
+from typing import Any, Iterable, Protocol, runtime_checkable
 
 
+@runtime_checkable
+class LazyLoading(Protocol): # optional, for interfaces that load models in background
+    is_ready: bool
+    
+    async def load(self): pass
+
 @runtime_checkable
 class SpeechRecognizerDelegate(Protocol):
     async def speech_recognizer_did_receive_final_result(self, result: str): pass
@@ -19,6 +25,23 @@ class SpeechRecognizer(Protocol):
 class SpeechSynthesizerResult(Protocol):
     async def play(self): pass
 
+@runtime_checkable
+class SpeechSynthesizerAudioResult(SpeechSynthesizerResult, Protocol): # optional, allows caching of the synthesized audio
+    audio: Any # float samples, numpy.ndarray or compatible
+    sample_rate: int
+
 @runtime_checkable   
 class SpeechSynthesizer(Protocol):
     async def synthesize(self, text: str) -> SpeechSynthesizerResult: pass
+
+@runtime_checkable
+class SpeechSynthesizerWarmUp(SpeechSynthesizer, Protocol): # optional, e.g. for caching synthesizers
+    async def warm_up(self, phrases: Iterable[str]): pass
+
+@runtime_checkable
+class SpeechSynthesizerBackground(SpeechSynthesizer, Protocol): # optional, live `synthesize` calls go first
+    async def synthesize_background(self, text: str) -> SpeechSynthesizerResult: pass
+
+@runtime_checkable
+class SpeechSynthesizerStreaming(SpeechSynthesizer, Protocol): # optional, the result starts playing before the whole text is synthesized
+    async def synthesize_stream(self, text: str) -> SpeechSynthesizerResult: pass
@@ -1,12 +1,19 @@
+from typing import cast
+from collections import deque
+from dataclasses import dataclass, field
 import os
+import time
 import numpy
 import torch
 import sounddevice
+import anyio
 import asyncer
-from .protocols import SpeechSynthesizer, SpeechSynthesizerResult
+from .protocols import SpeechSynthesizerBackground, SpeechSynthesizerStreaming, SpeechSynthesizerAudioResult
+from .speech_stream import StreamingSpeech, split_sentences
+from .lazy_loading import LazyLoader
 
 
-class Speech(SpeechSynthesizerResult):
+class Speech(SpeechSynthesizerAudioResult):
 
     def __init__(self, audio: numpy.ndarray, sample_rate: int):
         self.audio = audio
@@ -19,27 +26,135 @@ class Speech(SpeechSynthesizerResult):
     def stop(self):
         sounddevice.stop()
 
-class SileroSpeechSynthesizer(SpeechSynthesizer):
+@dataclass(eq = False)
+class InferenceRequest:
+    key: tuple[str, str, int] # text, speaker, sample rate
+    done: anyio.Event = field(default_factory = anyio.Event)
+    audio: torch.Tensor | None = None
+    error: Exception | None = None
+    waiters: int = 0 # identical requests share one inference
+
+class SileroSpeechSynthesizer(LazyLoader, SpeechSynthesizerBackground, SpeechSynthesizerStreaming):
+    '''
+    Inferences run one by one in a dedicated thread, so concurrent responses don't oversubscribe CPU cores. 
+    Identical concurrent requests share one inference, and live requests are inferred before background ones.
+    '''
+    
+    # inference metrics
+    last_latency = 0.0 # seconds from the request to the result, including waiting in the queue
+    max_latency = 0.0
+    last_inference_time = 0.0 # seconds of the model run only
+    
+    model: torch.nn.Module
+    _model_url: str
+    _device: torch.device
+    _queue: deque[InferenceRequest] # live requests waiting for the model
+    _background_queue: deque[InferenceRequest] # waiting until there are no live requests
+    _pending: dict[tuple[str, str, int], InferenceRequest] # queued or running inferences by key
+    _inference_lock: anyio.Lock | None = None # the request that holds it runs the next inference
+    _inference_limiter: anyio.CapacityLimiter | None = None # own thread, doesn't take a place in the default thread pool
     
-    def __init__(self, model_url: str, speaker: str = 'baya', threads: int = 4, device ='cpu', torch_backends_quantized_engine: str | None = 'qnnpack'):
+    def __init__(self, model_url: str, speaker: str = 'baya', threads: int = 4, device ='cpu', torch_backends_quantized_engine: str | None = 'qnnpack', lazy: bool = False):
         if torch_backends_quantized_engine:
             torch.backends.quantized.engine = torch_backends_quantized_engine
-        device = torch.device(device)
+        self._device = torch.device(device)
         torch.set_num_threads(threads)
-        local_file = 'downloads/' + model_url.split('/')[-1]
+        self._model_url = model_url
+        self.sample_rate = 24000
+        self.speaker = speaker
+        self._queue = deque()
+        self._background_queue = deque()
+        self._pending = {}
+        
+        if not lazy: # otherwise the model is loaded in background by load() or on the first synthesis
+            self.load_sync()
+
+    @property
+    def voice(self) -> str:
+        return self.speaker
+    
+    @property
+    def queue_depth(self) -> int:
+        '''Number of queued and running inferences.'''
+        return len(self._pending)
+
+    async def synthesize(self, text) -> Speech:
+        return await self._synthesize(text, background = False)
+    
+    async def synthesize_background(self, text) -> Speech:
+        return await self._synthesize(text, background = True)
+    
+    async def synthesize_stream(self, text) -> StreamingSpeech:
+        return StreamingSpeech(self, split_sentences(text))
+    
+    # private
+    
+    async def _synthesize(self, text: str, background: bool) -> Speech:
+        start = time.monotonic()
+        await self.load()
+        key = (text, self.speaker, self.sample_rate)
+        
+        if not (request := self._pending.get(key)):
+            request = self._pending[key] = InferenceRequest(key)
+            (self._background_queue if background else self._queue).append(request)
+        elif not background and request in self._background_queue: # became live
+            self._background_queue.remove(request)
+            self._queue.append(request)
+            
+        request.waiters += 1
+        try:
+            await self._wait(request)
+        finally:
+            request.waiters -= 1
+            for queue in (self._queue, self._background_queue):
+                if not request.waiters and request in queue: # cancelled before the inference started
+                    queue.remove(request)
+                    del self._pending[key]
+                
+        if request.error:
+            raise request.error
+                
+        self.last_latency = time.monotonic() - start
+        self.max_latency = max(self.max_latency, self.last_latency)
+        return Speech(cast(numpy.ndarray, request.audio), self.sample_rate) # set unless failed
+    
+    def _load(self): # runs in a worker thread if lazy
+        local_file = 'downloads/' + self._model_url.split('/')[-1]
         
         if not os.path.isdir('downloads'):
             os.mkdir('downloads')
 
         if not os.path.isfile(local_file):
-            torch.hub.download_url_to_file(model_url, local_file)
+            torch.hub.download_url_to_file(self._model_url, local_file)
             
         self.model = torch.package.PackageImporter(local_file).load_pickle('tts_models', 'model')
-        self.model.to(device)
-        self.sample_rate = 24000
-        self.speaker = speaker
-
-    async def synthesize(self, text) -> Speech:
-        synthesize_async = asyncer.asyncify(self.model.apply_tts)
-        audio = await synthesize_async(text = text, speaker = self.speaker, sample_rate = self.sample_rate)
-        return Speech(audio, self.sample_rate)
+        self.model.to(self._device)
+        
+    async def _wait(self, request: InferenceRequest):
+        # waiting requests take turns to run the next queued inference, so no background task is needed
+        if not self._inference_lock:
+            self._inference_lock = anyio.Lock()
+            self._inference_limiter = anyio.CapacityLimiter(1)
+        
+        while not request.done.is_set():
+            async with self._inference_lock:
+                if request.done.is_set():
+                    break # finished by another request meanwhile
+                
+                next_request = (self._queue or self._background_queue).popleft()
+                
+                # other requests may wait for this result, so it's finished even if this one is cancelled
+                with anyio.CancelScope(shield = True):
+                    try:
+                        next_request.audio = await anyio.to_thread.run_sync(self._apply_tts, *next_request.key, limiter = self._inference_limiter)
+                    except Exception as e:
+                        next_request.error = e
+                    finally:
+                        del self._pending[next_request.key]
+                        next_request.done.set()
+    
+    def _apply_tts(self, text: str, speaker: str, sample_rate: int) -> torch.Tensor: # runs in the inference thread
+        start = time.monotonic()
+        audio = self.model.apply_tts(text = text, speaker = speaker, sample_rate = sample_rate)
+        self.last_inference_time = time.monotonic() - start
+        return audio
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Protocol, Sequence, runtime_checkable
+from dataclasses import dataclass
+import os
+import numpy
+
+from ..general.dependencies import DependencyManager, DependencyScope
+
+
+@dataclass
+class Speaker:
+    id: int
+    similarity: float # cosine similarity to the speaker centroid, 1 for a new speaker
+
+@runtime_checkable
+class SpeakerRecognizer(Protocol):
+    last_speaker: Speaker | None # speaker of the last final result
+
+class SpeakerStore:
+    '''
+    Speaker embeddings with a batched nearest neighbour search by cosine similarity.
+    Every speaker is a centroid of all vectors identified as this speaker. With `path`, embeddings are persisted to a memory-mapped .npy file.
+    '''
+
+    dimension: int
+    threshold: float # min similarity to match a known speaker, otherwise a new speaker is added
+
+    _path: str | None
+    _sums: numpy.ndarray # (capacity, dimension + 1): sum of normalized vectors and their count; may be memory-mapped
+    _centroids: numpy.ndarray # (capacity, dimension): normalized sums for the search
+    _count: int
+
+    def __init__(self, path: str | None = None, dimension: int = 128, threshold: float = 0.75, capacity: int = 16):
+        self.dimension = dimension
+        self.threshold = threshold
+        self._path = path
+
+        if path and os.path.isfile(path):
+            self._sums = numpy.load(path, mmap_mode = 'r+')
+            assert self._sums.shape[1] == dimension + 1, f'Speaker store "{path}" has dimension {self._sums.shape[1] - 1}, expected {dimension}'
+            self._count = int(numpy.count_nonzero(self._sums[:, -1]))
+        else:
+            self._sums = self._allocate(capacity)
+            self._count = 0
+
+        self._centroids = self._normalize(numpy.array(self._sums[:, :-1]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def centroids(self) -> numpy.ndarray:
+        return self._centroids[:self._count]
+
+    def search(self, vectors: numpy.ndarray | Sequence[float] | Sequence[Sequence[float]]) -> tuple[numpy.ndarray, numpy.ndarray]:
+        '''Nearest speakers for a vector or a batch of vectors: (ids, similarities). Ids are -1 if the store is empty.'''
+        vectors = self._normalize(numpy.atleast_2d(numpy.asarray(vectors, dtype = numpy.float32)))
+
+        if not self._count:
+            return numpy.full(len(vectors), -1), numpy.zeros(len(vectors), dtype = numpy.float32)
+
+        similarities = vectors @ self.centroids.T # (vectors, speakers)
+        ids = similarities.argmax(axis = 1)
+        return ids, similarities[numpy.arange(len(vectors)), ids]
+
+    def identify(self, vector: numpy.ndarray | Sequence[float]) -> Speaker:
+        '''Returns the nearest known speaker and moves its centroid to the vector, or adds a new speaker if no one is similar enough.'''
+        ids, similarities = self.search(vector)
+        speaker_id, similarity = int(ids[0]), float(similarities[0])
+
+        if speaker_id < 0 or similarity < self.threshold:
+            return Speaker(self.add(vector), 1.0)
+
+        self.update(speaker_id, vector)
+        return Speaker(speaker_id, similarity)
+
+    def add(self, vector: numpy.ndarray | Sequence[float]) -> int:
+        if self._count == len(self._sums):
+            self._grow()
+
+        speaker_id = self._count
+        self._count += 1
+        self.update(speaker_id, vector)
+        return speaker_id
+
+    def update(self, speaker_id: int, vector: numpy.ndarray | Sequence[float]):
+        assert 0 <= speaker_id < self._count, f'Unknown speaker: {speaker_id}'
+
+        row = self._sums[speaker_id]
+        row[:-1] += self._normalize(numpy.asarray(vector, dtype = numpy.float32))
+        row[-1] += 1
+        self._centroids[speaker_id] = self._normalize(row[:-1])
+        self._flush()
+
+    # private
+
+    def _allocate(self, capacity: int) -> numpy.ndarray:
+        shape = (capacity, self.dimension + 1)
+        if self._path:
+            return numpy.lib.format.open_memmap(self._path, mode = 'w+', dtype = numpy.float32, shape = shape)
+        return numpy.zeros(shape, dtype = numpy.float32)
+
+    def _grow(self):
+        sums = numpy.array(self._sums) # in-memory copy, the file is recreated
+        capacity = len(sums) * 2
+
+        if isinstance(self._sums, numpy.memmap):
+            self._sums.flush()
+            del self._sums # release the file before recreating it
+
+        self._sums = self._allocate(capacity)
+        self._sums[:len(sums)] = sums
+        self._centroids = numpy.concatenate([self._centroids, numpy.zeros_like(self._centroids)])
+
+    def _flush(self):
+        if isinstance(self._sums, numpy.memmap):
+            self._sums.flush()
+
+    @staticmethod
+    def _normalize(vectors: numpy.ndarray) -> numpy.ndarray:
+        norms = numpy.linalg.norm(vectors, axis = -1, keepdims = True)
+        return vectors / numpy.where(norms == 0, 1, norms) # keep empty rows zero
+
+def add_speaker_provider(dependency_manager: DependencyManager, recognizer: SpeakerRecognizer):
+    '''Injects the speaker of the current utterance into commands with `speaker: Speaker` parameter, None if unknown.'''
+    dependency_manager.add_provider('speaker', Speaker, lambda: recognizer.last_speaker, DependencyScope.utterance)
@@ -0,0 +1,238 @@
+from typing import Iterable
+from collections import OrderedDict
+import os
+import json
+import hashlib
+import wave
+import numpy
+import sounddevice
+import anyio
+import asyncer
+
+from ..general.cache import LRUCache
+from .protocols import LazyLoading, SpeechSynthesizerWarmUp, SpeechSynthesizerStreaming, SpeechSynthesizerBackground, SpeechSynthesizer, SpeechSynthesizerResult, SpeechSynthesizerAudioResult
+from .speech_stream import StreamingSpeech, split_sentences
+
+
+class CachedSpeech(SpeechSynthesizerAudioResult):
+
+    audio: numpy.ndarray # float32, (frames,) or (frames, channels)
+    sample_rate: int
+
+    def __init__(self, audio: numpy.ndarray, sample_rate: int):
+        self.audio = audio
+        self.sample_rate = sample_rate
+
+    async def play(self):
+        play_async = asyncer.asyncify(sounddevice.play)
+        await play_async(self.audio, self.sample_rate, blocking = True)
+
+    def stop(self):
+        sounddevice.stop()
+
+class CachedSpeechSynthesizer(SpeechSynthesizerWarmUp, SpeechSynthesizerStreaming):
+    '''
+    Wraps any speech synthesizer and caches synthesized audio by a hash of (engine, voice, sample rate, text).
+    Audio is stored as WAV files in the directory with LRU eviction by total size, and the most recent speeches are kept decoded in memory.
+    Results that don't provide `audio` and `sample_rate` (see `SpeechSynthesizerAudioResult`) are not cached.
+    Cached phrases are recorded, so `warm_up` can synthesize them again, e.g. after eviction or voice change.
+    '''
+    
+    max_recorded_phrases = 1024
+
+    synthesizer: SpeechSynthesizer
+    directory: str
+    max_disk_size: int # bytes
+    memory_cache: LRUCache[str, CachedSpeech]
+
+    _disk_files: OrderedDict[str, int] # key -> file size, least recently used first
+    _disk_size: int
+    _phrases: dict[str, None] # ordered set of recorded texts
+    _live_synthesis = 0
+    _idle_event: anyio.Event | None = None # set when there is no live synthesis, shared by all waiting warm-ups
+
+    def __init__(self, synthesizer: SpeechSynthesizer, directory: str = 'audio/cache', max_disk_size: int = 256 * 2**20, memory_size: int = 32):
+        self.synthesizer = synthesizer
+        self.directory = directory
+        self.max_disk_size = max_disk_size
+        self.memory_cache = LRUCache(memory_size)
+
+        os.makedirs(directory, exist_ok = True)
+
+        # restore the usage order from modification times, they are updated on every hit
+        files = [entry for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith('.wav')]
+        files.sort(key = lambda entry: entry.stat().st_mtime)
+        self._disk_files = OrderedDict((entry.name.removesuffix('.wav'), entry.stat().st_size) for entry in files)
+        self._disk_size = sum(self._disk_files.values())
+        
+        try:
+            with open(self._phrases_path) as file:
+                self._phrases = dict.fromkeys(json.load(file))
+        except FileNotFoundError:
+            self._phrases = {}
+
+    def key(self, text: str) -> str:
+        synthesizer = self.synthesizer
+        engine = f'{type(synthesizer).__module__}.{type(synthesizer).__qualname__}'
+        voice = getattr(synthesizer, 'voice', None)
+        sample_rate = getattr(synthesizer, 'sample_rate', None)
+        return hashlib.sha256(json.dumps([engine, voice, sample_rate, text]).encode()).hexdigest()
+
+    @property
+    def is_ready(self) -> bool:
+        return not isinstance(self.synthesizer, LazyLoading) or self.synthesizer.is_ready
+    
+    async def load(self):
+        if isinstance(self.synthesizer, LazyLoading):
+            await self.synthesizer.load()
+
+    @property
+    def recorded_phrases(self) -> list[str]:
+        return list(self._phrases)
+
+    async def synthesize(self, text: str) -> SpeechSynthesizerResult:
+        self._live_synthesis += 1
+        try:
+            return await self._synthesize(text)
+        finally:
+            self._live_synthesis -= 1
+            if not self._live_synthesis and self._idle_event:
+                self._idle_event.set()
+                
+    async def synthesize_stream(self, text: str) -> SpeechSynthesizerResult:
+        '''Whole cached text is played at once, otherwise sentences are synthesized and cached one by one during playback.'''
+        key = self.key(text)
+        if key in self.memory_cache or key in self._disk_files:
+            return await self.synthesize(text)
+        return StreamingSpeech(self, split_sentences(text))
+                
+    async def warm_up(self, phrases: Iterable[str] = ()):
+        '''
+        Synthesizes phrases and recorded phrases that aren't cached yet, one by one in the background.
+        Every phrase waits until there is no live synthesis, and live requests go first if the synthesizer supports `synthesize_background`.
+        '''
+        for text in dict.fromkeys([*phrases, *self._phrases]):
+            key = self.key(text)
+            if key in self._disk_files or key in self.memory_cache:
+                continue
+            
+            while self._live_synthesis:
+                if not self._idle_event or self._idle_event.is_set():
+                    self._idle_event = anyio.Event()
+                await self._idle_event.wait()
+                
+            try:
+                await self._synthesize(text, background = True)
+            except Exception as e:
+                print(f'\n[ERROR] Can`t warm up speech "{text}"\n', e)
+
+    def clear(self):
+        self.memory_cache.clear()
+        for key in list(self._disk_files):
+            self._remove(key)
+
+    # private
+    
+    @property
+    def _phrases_path(self) -> str:
+        return os.path.join(self.directory, 'phrases.json')
+
+    async def _synthesize(self, text: str, background: bool = False) -> SpeechSynthesizerResult:
+        key = self.key(text)
+
+        if speech := self.memory_cache.get(key):
+            self._touch(key)
+            return speech
+
+        if key in self._disk_files:
+            speech = await asyncer.asyncify(self._read)(key)
+            self._touch(key)
+            self.memory_cache.set(key, speech)
+            return speech
+
+        if background and isinstance(self.synthesizer, SpeechSynthesizerBackground):
+            result = await self.synthesizer.synthesize_background(text)
+        else:
+            result = await self.synthesizer.synthesize(text)
+
+        if not isinstance(result, SpeechSynthesizerAudioResult):
+            return result # can't be cached
+
+        speech = CachedSpeech(numpy.asarray(result.audio, dtype = numpy.float32), result.sample_rate)
+
+        if speech.audio.size: # don't cache failed synthesis
+            size = await asyncer.asyncify(self._write)(key, speech)
+            self._add_disk_file(key, size)
+            if not background: # keep the memory for live responses
+                self.memory_cache.set(key, speech)
+            if text not in self._phrases:
+                await self._record_phrase(text)
+
+        return speech
+        
+    async def _record_phrase(self, text: str):
+        self._phrases[text] = None
+        while len(self._phrases) > self.max_recorded_phrases:
+            del self._phrases[next(iter(self._phrases))]
+            
+        phrases = list(self._phrases)
+        
+        def write():
+            with open(self._phrases_path + '.tmp', 'w') as file:
+                json.dump(phrases, file, ensure_ascii = False)
+            os.replace(self._phrases_path + '.tmp', self._phrases_path)
+            
+        await asyncer.asyncify(write)()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.wav')
+
+    def _read(self, key: str) -> CachedSpeech:
+        with wave.open(self._path(key), 'rb') as file:
+            channels = file.getnchannels()
+            sample_rate = file.getframerate()
+            frames = numpy.frombuffer(file.readframes(file.getnframes()), dtype = '<i2')
+
+        audio = frames.astype(numpy.float32) / 32767
+        if channels > 1:
+            audio = audio.reshape(-1, channels)
+        return CachedSpeech(audio, sample_rate)
+
+    def _write(self, key: str, speech: CachedSpeech) -> int:
+        path = self._path(key)
+        channels = speech.audio.shape[1] if speech.audio.ndim > 1 else 1
+        frames = (numpy.clip(speech.audio, -1, 1) * 32767).astype('<i2')
+
+        # write to a temporary file and rename, so a reader never sees a partial file
+        with wave.open(path + '.tmp', 'wb') as file:
+            file.setnchannels(channels)
+            file.setsampwidth(2)
+            file.setframerate(speech.sample_rate)
+            file.writeframes(frames.tobytes())
+        os.replace(path + '.tmp', path)
+        
+        return os.path.getsize(path)
+    
+    def _add_disk_file(self, key: str, size: int):
+        self._disk_size += size - self._disk_files.get(key, 0) # may be rewritten by concurrent synthesis of the same text
+        self._disk_files[key] = size
+        self._disk_files.move_to_end(key)
+
+        # evict least recently used, but keep the new one
+        while self._disk_size > self.max_disk_size and len(self._disk_files) > 1:
+            self._remove(next(iter(self._disk_files)))
+
+    def _touch(self, key: str):
+        if key in self._disk_files:
+            self._disk_files.move_to_end(key)
+            try:
+                os.utime(self._path(key)) # keeps the order after restart
+            except FileNotFoundError:
+                pass
+
+    def _remove(self, key: str):
+        self._disk_size -= self._disk_files.pop(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,103 @@
+import re
+import numpy
+import sounddevice
+import anyio
+from anyio.streams.memory import MemoryObjectSendStream, MemoryObjectReceiveStream
+import asyncer
+
+from .protocols import SpeechSynthesizer, SpeechSynthesizerResult, SpeechSynthesizerAudioResult
+
+
+_sentence_end = re.compile(r'(?<=[.!?…;])\s+')
+
+def split_sentences(text: str, min_length: int = 20) -> list[str]:
+    '''Splits text by sentences. Short sentences are joined with the next ones to avoid too many synthesis calls.'''
+    sentences: list[str] = []
+    current = ''
+
+    for sentence in _sentence_end.split(text.strip()):
+        current = f'{current} {sentence}' if current else sentence
+        if len(current) >= min_length:
+            sentences.append(current)
+            current = ''
+
+    if current:
+        sentences.append(current)
+
+    return sentences
+
+class StreamingSpeech(SpeechSynthesizerResult):
+    '''Synthesizes the next sentence while the current one is playing. Audio results are written to one continuous output stream.'''
+
+    synthesizer: SpeechSynthesizer
+    sentences: list[str]
+
+    _stream: sounddevice.OutputStream | None = None
+    _stopped = False
+
+    def __init__(self, synthesizer: SpeechSynthesizer, sentences: list[str]):
+        self.synthesizer = synthesizer
+        self.sentences = sentences
+
+    async def play(self):
+        self._stopped = False
+        send_speeches, receive_speeches = anyio.create_memory_object_stream(1) # one sentence ahead of playback
+
+        async with anyio.create_task_group() as group:
+            group.start_soon(self._synthesize, send_speeches)
+            await self._play(receive_speeches)
+            group.cancel_scope.cancel() # stopped, don't synthesize the rest
+
+    def stop(self):
+        self._stopped = True
+        if stream := self._stream:
+            stream.abort() # drop buffered audio
+
+    # private
+
+    async def _synthesize(self, send_speeches: MemoryObjectSendStream[SpeechSynthesizerResult]):
+        async with send_speeches:
+            for sentence in self.sentences:
+                await send_speeches.send(await self.synthesizer.synthesize(sentence))
+
+    async def _play(self, receive_speeches: MemoryObjectReceiveStream[SpeechSynthesizerResult]):
+        try:
+            async with receive_speeches:
+                async for speech in receive_speeches:
+                    if self._stopped:
+                        break
+
+                    if not isinstance(speech, SpeechSynthesizerAudioResult):
+                        await speech.play() # fallback, can't be streamed
+                        continue
+
+                    audio = numpy.asarray(speech.audio, dtype = numpy.float32)
+                    if not audio.size:
+                        continue
+
+                    channels = audio.shape[1] if audio.ndim > 1 else 1
+                    stream = self._stream
+
+                    if not stream or stream.samplerate != speech.sample_rate or stream.channels != channels:
+                        if stream:
+                            await asyncer.asyncify(self._close)(stream)
+                        stream = self._stream = sounddevice.OutputStream(samplerate = speech.sample_rate, channels = channels, dtype = 'float32')
+                        stream.start()
+
+                    # blocks only while the output buffer is full, so sentences are played without gaps
+                    try:
+                        await asyncer.asyncify(stream.write)(audio.reshape(-1, channels))
+                    except sounddevice.PortAudioError:
+                        if self._stopped:
+                            break # aborted by stop()
+                        raise
+        finally:
+            if stream := self._stream:
+                self._stream = None
+                with anyio.CancelScope(shield = True):
+                    await asyncer.asyncify(self._close)(stream)
+
+    @staticmethod
+    def _close(stream: sounddevice.OutputStream):
+        stream.stop() # waits until the buffered audio is played
+        stream.close()
@@ -1,21 +1,39 @@
-from typing import Optional, cast
+from __future__ import annotations
+from typing import Any, Callable, Optional, TYPE_CHECKING, cast
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from enum import auto, Enum
 import os
+import time
+import math
 import urllib.request
 import zipfile
-import anyio
 import json
-from queue import Queue, Empty
+import anyio
+from anyio.streams.memory import MemoryObjectSendStream, MemoryObjectReceiveStream
+from queue import Queue, Empty, Full
 
 import sounddevice
 import vosk
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field
+
+try:
+    import orjson # faster, optional
+    loads: Callable[[str | bytes], Any] = orjson.loads
+except ImportError:
+    loads = json.loads
 
 from .protocols import SpeechRecognizer, SpeechRecognizerDelegate
+from .audio_sources import AudioSource
+from .lazy_loading import LazyLoader
+if TYPE_CHECKING:
+    from .speakers import Speaker, SpeakerStore # needs numpy
 
 
 vosk.SetLogLevel(-1)
 
+# full schemas of kaldi results, results are parsed with KaldiFinalResult to skip validation of every word
+
 class KaldiTranscriptionWord(BaseModel):
     word: str
     start: float
@@ -40,17 +58,67 @@ class KaldiTranscription(BaseModel):
 class KaldiResult(BaseModel):
     alternatives: list[KaldiTranscription]
 
-class VoskSpeechRecognizer(SpeechRecognizer):
+@dataclass
+class KaldiFinalResult:
+    '''Fields of a final kaldi result that are used, read from the MBR schema (default) or the alternatives schema.'''
+    
+    text: str
+    words: list[dict[str, Any]] = field(default_factory = list) # {"word", "start", "end", "conf" (MBR only)}
+    spk: list[float] | None = None # speaker vector, only with a speaker model
+    
+    @property
+    def confidence(self) -> float | None:
+        confs = [word['conf'] for word in self.words if 'conf' in word]
+        return sum(confs) / len(confs) if confs else None
+    
+    @classmethod
+    def from_json(cls, raw_json: str | bytes) -> KaldiFinalResult:
+        data = loads(raw_json) # once, the schema is picked by keys
+        
+        if alternatives := data.get('alternatives'): # SetMaxAlternatives(1+): {"alternatives": [{"text", "result", "confidence"}]}
+            data = alternatives[0]
+        
+        # MBR: {"text", "result"?, "spk"?, "spk_frames"?}
+        text = data.get('text')
+        words = data.get('result')
+        spk = data.get('spk')
+        
+        return cls(
+            text = text if isinstance(text, str) else '',
+            words = words if isinstance(words, list) else [],
+            spk = spk if isinstance(spk, list) else None
+        )
+
+class AudioOverflowPolicy(Enum):
+    drop_oldest = auto() # drop the oldest pending block to keep latency low
+    block = auto() # block the audio input callback until the decoder takes a block
+    coalesce = auto() # merge all pending blocks into one, nothing is lost but latency grows
+
+class VoskSpeechRecognizer(LazyLoader, SpeechRecognizer):
 
     _delegate: SpeechRecognizerDelegate | None = None
 
-    audio_queue: Queue
+    audio_queue: Queue[tuple[float, bytes] | None] # (capture time, data); None stops the decoder
+    audio_queue_size = 16 # blocks
+    overflow_policy = AudioOverflowPolicy.drop_oldest
+    
+    # decoder metrics
+    dropped_frames = 0
+    decode_lag = 0.0 # seconds from capturing the last decoded block to the end of its decoding
+    max_decode_lag = 0.0
+    final_result_latency = 0.0 # seconds from capturing the last speech (last partial change) to the final result
+    max_final_result_latency = 0.0
 
     samplerate: int
-    blocksize = 8000
+    blocksize = 8000 # frames per decoded block
+    adaptive_blocksize = False # decode small blocks during speech and large blocks in silence
+    speech_blocksize = 1600 # frames; audio is captured with this size in adaptive mode
+    silence_blocksize = 8000 # frames; small blocks are merged up to this size in adaptive mode
     dtype = 'int16'
     channels = 1
     kaldiRecognizer: vosk.KaldiRecognizer
+    _vosk_model: vosk.Model
+    _speaker_model: vosk.SpkModel | None
 
     last_result: Optional[str] = ''
     last_partial_result: str = ''
@@ -59,43 +127,37 @@ class VoskSpeechRecognizer(SpeechRecognizer):
     is_recognizing = True
     _is_listening = False
     
-    _stored_speakers: dict[int, list[int]] = {}
-    _speaker_trashold = 0.75
-
-    def __init__(self, model_url: str, speaker_model_url: str | None = None):
-        downloads = 'downloads'
-        model_path = downloads + '/' + model_url.split('/')[-1].replace('.zip', '')
-        zip_path = model_path + '.zip'
-        speaker_model_path = downloads + '/' + speaker_model_url.split('/')[-1].replace('.zip', '') if speaker_model_url else None
-        
-        if not os.path.isdir('downloads'):
-            os.mkdir('downloads')
+    _speech_active = False # set by the event loop, read by the decoder thread
+    _last_speech_time: float | None = None # capture time of the block that changed the partial result
+    
+    speaker_store: SpeakerStore | None = None # identifies speakers by vectors of the speaker model
+    last_speaker: Speaker | None = None
+    
+    _model_url: str
+    _speaker_model_url: str | None
 
-        if not os.path.isdir(model_path):
-            print('VOSK: Downloading model...')
-            urllib.request.urlretrieve(model_url, zip_path)
-            zip_file = zipfile.ZipFile(zip_path)
-            zip_file.extractall(downloads)
-            os.remove(zip_path)
-            print('VOSK: Model downloaded!')
+    def __init__(
+        self, 
+        model_url: str, 
+        speaker_model_url: str | None = None, 
+        blocksize: int | None = None, 
+        adaptive_blocksize: bool | None = None,
+        speaker_store: SpeakerStore | None = None,
+        lazy: bool = False
+    ):
+        self.speaker_store = speaker_store
+        if blocksize is not None:
+            self.blocksize = blocksize
+        if adaptive_blocksize is not None:
+            self.adaptive_blocksize = adaptive_blocksize
             
-        if speaker_model_url and not os.path.isdir(cast(str, speaker_model_path)):
-            print('VOSK: Downloading speaker model...')
-            urllib.request.urlretrieve(speaker_model_url, zip_path)
-            zip_file = zipfile.ZipFile(zip_path)
-            zip_file.extractall(downloads)
-            os.remove(zip_path)
-            print('VOSK: Speaker model downloaded!')
-        
-        self.audio_queue = Queue()
+        self._model_url = model_url
+        self._speaker_model_url = speaker_model_url
+        self.audio_queue = Queue(maxsize = self.audio_queue_size)
         self.samplerate = int(sounddevice.query_devices(kind = 'input')['default_samplerate'])
-        vosk_model = vosk.Model(model_path)
-        speaker_model = vosk.SpkModel(speaker_model_path) if speaker_model_path else None
-        self.kaldiRecognizer = vosk.KaldiRecognizer(vosk_model, self.samplerate)
-        self.kaldiRecognizer.SetMaxAlternatives(0) # 0 (default) returns KaldiMBR; 1+ returns KaldiResult (with bad confidence implementation)
-        self.kaldiRecognizer.SetWords(True) # needs to calculate MBR average confidence; (default: False)
-        if speaker_model_url:
-            self.kaldiRecognizer.SetSpkModel(speaker_model)
+        
+        if not lazy: # otherwise models are loaded in background by load() or on start
+            self.load_sync()
         
     @property
     def delegate(self):
@@ -110,58 +172,224 @@ class VoskSpeechRecognizer(SpeechRecognizer):
     def sounddevice_parameters(self):
         return {
             'samplerate': self.samplerate,
-            'blocksize': self.blocksize,
+            'blocksize': self.speech_blocksize if self.adaptive_blocksize else self.blocksize,
             'dtype': self.dtype,
             'channels': self.channels,
             'callback': self._audio_input_callback
         }
 
+    @property
+    def bytes_per_frame(self) -> int:
+        return 2 * self.channels # vosk decodes 16-bit PCM
+
     def stop_listening(self):
         self._is_listening = False
-        self.audio_queue = Queue()
+        audio_queue, self.audio_queue = self.audio_queue, Queue(maxsize = self.audio_queue_size)
+        self._stop_decoder(audio_queue)
 
     async def start_listening(self):
         if self._is_listening: return
 
-        self.last_partial_result = ''
-        self.last_partial_update_time = None
         self._is_listening = True
+        try:
+            await self.load()
+        except BaseException:
+            self._is_listening = False
+            raise
+        
+        if not self._is_listening: 
+            return # stopped while loading
+        
+        self._reset_results()
 
-        with sounddevice.RawInputStream(**self.sounddevice_parameters):
-            while self._is_listening:
+        try:
+            with sounddevice.RawInputStream(**self.sounddevice_parameters):
+                await self._run_decoder(self.audio_queue, self.kaldiRecognizer)
+        finally: # also if cancelled, so listening can start again
+            if self._is_listening:
+                self.stop_listening()
+            
+    async def transcribe(self, source: AudioSource):
+        '''Decode recorded audio as fast as possible, results are sent to the delegate like for live audio.'''
+        assert not self._is_listening, 'Can`t transcribe while listening'
+        
+        await self.load()
+        self._reset_results()
+        audio_queue: Queue[tuple[float, bytes] | None] = Queue(maxsize = self.audio_queue_size)
+        kaldi_recognizer = self._create_kaldi_recognizer(source.samplerate) # own decoding state, also fits the source samplerate
+        
+        async def feed():
+            block_bytes = self.blocksize * self.bytes_per_frame
+            leftover = b'' # incomplete frame of the previous chunk
+            try:
+                async for chunk in source:
+                    data = leftover + chunk
+                    end = len(data) - len(data) % self.bytes_per_frame
+                    leftover = data[end:]
+                    # split large chunks into blocks like live audio for the same partial results
+                    for i in range(0, end, block_bytes):
+                        # nothing is dropped, reading waits for the decoder
+                        await anyio.to_thread.run_sync(audio_queue.put, (time.monotonic(), data[i:min(i + block_bytes, end)]), cancellable = True)
+                await anyio.to_thread.run_sync(audio_queue.put, None, cancellable = True) # the source is over, decode the rest
+            except BaseException: # cancelled or failed, awaiting isn't possible here
+                self._stop_decoder(audio_queue)
+                raise
+        
+        async with anyio.create_task_group() as group:
+            group.start_soon(feed)
+            await self._run_decoder(audio_queue, kaldi_recognizer, flush = True)
+            
+    # private
+    
+    def _load(self): # runs in a worker thread if lazy
+        model_url, speaker_model_url = self._model_url, self._speaker_model_url
+        downloads = 'downloads'
+        model_path = downloads + '/' + model_url.split('/')[-1].replace('.zip', '')
+        zip_path = model_path + '.zip'
+        speaker_model_path = downloads + '/' + speaker_model_url.split('/')[-1].replace('.zip', '') if speaker_model_url else None
+        
+        if not os.path.isdir('downloads'):
+            os.mkdir('downloads')
+
+        if not os.path.isdir(model_path):
+            print('VOSK: Downloading model...')
+            urllib.request.urlretrieve(model_url, zip_path)
+            zip_file = zipfile.ZipFile(zip_path)
+            zip_file.extractall(downloads)
+            os.remove(zip_path)
+            print('VOSK: Model downloaded!')
+            
+        if speaker_model_url and not os.path.isdir(cast(str, speaker_model_path)):
+            print('VOSK: Downloading speaker model...')
+            urllib.request.urlretrieve(speaker_model_url, zip_path)
+            zip_file = zipfile.ZipFile(zip_path)
+            zip_file.extractall(downloads)
+            os.remove(zip_path)
+            print('VOSK: Speaker model downloaded!')
+        
+        self._vosk_model = vosk.Model(model_path)
+        self._speaker_model = vosk.SpkModel(speaker_model_path) if speaker_model_path else None
+        self.kaldiRecognizer = self._create_kaldi_recognizer(self.samplerate)
+        
+    def _create_kaldi_recognizer(self, samplerate: int) -> vosk.KaldiRecognizer:
+        kaldi_recognizer = vosk.KaldiRecognizer(self._vosk_model, samplerate)
+        kaldi_recognizer.SetMaxAlternatives(0) # 0 (default) returns KaldiMBR; 1+ returns KaldiResult (with bad confidence implementation)
+        kaldi_recognizer.SetWords(True) # needs to calculate MBR average confidence; (default: False)
+        if self._speaker_model:
+            kaldi_recognizer.SetSpkModel(self._speaker_model)
+        return kaldi_recognizer
+    
+    def _reset_results(self):
+        self.last_partial_result = ''
+        self.last_partial_update_time = None
+        self._speech_active = False
+        self._last_speech_time = None
+    
+    async def _run_decoder(self, audio_queue: Queue[tuple[float, bytes] | None], kaldi_recognizer: vosk.KaldiRecognizer, flush: bool = False):
+        # decoder thread sends raw kaldi results (is final, json, capture time) to the event loop
+        send_results, receive_results = anyio.create_memory_object_stream(math.inf)
+        
+        async with anyio.create_task_group() as group:
+            group.start_soon(self._handle_results, receive_results)
+            async with send_results:
                 try:
-                    if data := self.audio_queue.get(block = False):
-                        await self._transcribe(data)
-                except Empty:
-                    pass
-                await anyio.sleep(0.01)
+                    # dedicated thread, doesn't take a place in the default thread pool
+                    await anyio.to_thread.run_sync(
+                        self._decode, audio_queue, kaldi_recognizer, send_results, flush,
+                        cancellable = True, limiter = anyio.CapacityLimiter(1)
+                    )
+                finally: # if cancelled, the abandoned thread still waits for audio, it must exit by itself
+                    self._stop_decoder(audio_queue)
+                    
+    @staticmethod
+    def _stop_decoder(audio_queue: Queue[tuple[float, bytes] | None]):
+        # drop pending audio and wake up the decoder, never blocks
+        while True:
+            try:
+                while True:
+                    audio_queue.get_nowait()
+            except Empty:
+                pass
+            try:
+                audio_queue.put_nowait(None)
+                return
+            except Full:
+                pass # audio input added a block meanwhile
+                    
+    def _decode(
+        self,
+        audio_queue: Queue[tuple[float, bytes] | None],
+        kaldi_recognizer: vosk.KaldiRecognizer,
+        send_results: MemoryObjectSendStream[tuple[bool, str, float]],
+        flush: bool
+    ): # runs in the decoder thread
+        while True:
+            item = self._next_block(audio_queue)
+            if item is None: # stopped or the source is over
+                if flush: # decode the rest of speech after the last endpoint
+                    anyio.from_thread.run_sync(send_results.send_nowait, (True, kaldi_recognizer.FinalResult(), time.monotonic()))
+                break
+            
+            capture_time, data = item
+            
+            # decoding is CPU-heavy, it must not block the event loop
+            if kaldi_recognizer.AcceptWaveform(data):
+                result = (True, kaldi_recognizer.Result(), capture_time)
+            else:
+                result = (False, kaldi_recognizer.PartialResult(), capture_time)
                 
-    async def _transcribe(self, data):
+            self.decode_lag = time.monotonic() - capture_time
+            self.max_decode_lag = max(self.max_decode_lag, self.decode_lag)
+                
+            anyio.from_thread.run_sync(send_results.send_nowait, result)
+            
+    def _next_block(self, audio_queue: Queue[tuple[float, bytes] | None]) -> tuple[float, bytes] | None: # runs in the decoder thread
+        item = audio_queue.get()
+        
+        if not self.adaptive_blocksize or self._speech_active or item is None:
+            return item
+        
+        # silence: merge small blocks into a large one to decode less often
+        capture_time, data = item
+        blocks = [data]
+        size = len(data)
+        
+        while size < self.silence_blocksize * self.bytes_per_frame:
+            item = audio_queue.get()
+            if item is None:
+                audio_queue.put_nowait(None) # keep the stop signal for the decoding loop
+                break
+            capture_time, data = item # the last block's time, so merging doesn't inflate the decode lag
+            blocks.append(data)
+            size += len(data)
+            
+        return capture_time, b''.join(blocks)
+            
+    async def _handle_results(self, receive_results: MemoryObjectReceiveStream[tuple[bool, str, float]]):
+        async with receive_results:
+            async for is_final, raw_json, capture_time in receive_results:
+                await self._handle_result(is_final, raw_json, capture_time)
+                
+    async def _handle_result(self, is_final: bool, raw_json: str, capture_time: float):
+        if is_final:
+            self._speech_active = False
+            
+            if self._last_speech_time is not None:
+                self.final_result_latency = time.monotonic() - self._last_speech_time
+                self.max_final_result_latency = max(self.max_final_result_latency, self.final_result_latency)
+                self._last_speech_time = None
+        
         delegate = self.delegate
         if not delegate: return
         
-        if self.kaldiRecognizer.AcceptWaveform(data):
+        if is_final:
             self.last_partial_update_time = None
-            raw_json = self.kaldiRecognizer.Result()
-            text: str | None = None
-            
-            try:
-                result = KaldiMBR.parse_raw(raw_json)
-                text = result.text
-                # print('\nConfidence:', result.confidence)
-            except ValidationError:
-                try:
-                    result = KaldiResult.parse_raw(raw_json)
-                    transcription = result.alternatives[0]
-                    text = transcription.text
-                except ValidationError:
-                    text = json.loads(raw_json).get('text')
+            result = KaldiFinalResult.from_json(raw_json)
+            text = result.text
+            # print('\nConfidence:', result.confidence)
             
             if text:
-                # if result.spk:
-                #     speaker, similarity = self._get_speaker(result.spk)
-                #     print(f'\nSpeaker: {speaker} ({similarity * 100:.2f}%)\n')
-                
+                self.last_speaker = self.speaker_store.identify(result.spk) if self.speaker_store and result.spk else None
                 self.last_result = text
                 await delegate.speech_recognizer_did_receive_final_result(text)
             else:
@@ -169,39 +397,50 @@ class VoskSpeechRecognizer(SpeechRecognizer):
                 await delegate.speech_recognizer_did_receive_empty_result()
                 
         else:
-            result = json.loads(self.kaldiRecognizer.PartialResult())
             # partial always returns {"partial": "..."}
-            if (string := result.get('partial')) and string != self.last_partial_result:
+            if (string := loads(raw_json).get('partial')) and string != self.last_partial_result:
+                self._speech_active = True
+                self._last_speech_time = capture_time
                 self.last_partial_result = string
                 self.last_partial_update_time = datetime.now()
                 await delegate.speech_recognizer_did_receive_partial_result(string)
 
-    def _audio_input_callback(self, indata, frames, time, status):
+    def _audio_input_callback(self, indata, frames, time_info, status):
         if not self.is_recognizing: return
-        self.audio_queue.put(bytes(indata))
+        self._put_audio(bytes(indata))
         
-    def _get_speaker(self, vector: list[int]) -> tuple[int, float]:
-        # TODO: search Is not working good, need to improve the algorithm
+    def _put_audio(self, data: bytes): # runs in the audio input thread
+        audio_queue = self.audio_queue
+        item = (time.monotonic(), data)
         
-        matched_speaker_id = None
-        best_similarity = -1.0
+        if self.overflow_policy == AudioOverflowPolicy.block:
+            audio_queue.put(item)
+            return
         
-        for speaker_id, vec in self._stored_speakers.items():
-            similarity = self._cosine_similarity(vector, vec)
-            if similarity > best_similarity:
-                best_similarity = similarity
-                matched_speaker_id = speaker_id
-                
-        if not best_similarity or best_similarity < self._speaker_trashold:
-            matched_speaker_id = len(self._stored_speakers)
-            self._stored_speakers[matched_speaker_id] = vector
-            # print(f'New speaker: {matched_speaker_id}, similarity: {best_similarity * 100:.2f}%')
-            best_similarity = 1
+        while True:
+            try:
+                audio_queue.put_nowait(item)
+                return
+            except Full:
+                pass
             
-        return cast(int, matched_speaker_id), best_similarity
-        
-    def _cosine_similarity(self, vector_a, vector_b) -> float:
-        dot_product = sum(a*b for a, b in zip(vector_a, vector_b))
-        norm_a = sum(a*a for a in vector_a) ** 0.5
-        norm_b = sum(b*b for b in vector_b) ** 0.5
-        return dot_product / (norm_a * norm_b)
+            # the decoder is behind, free space according to the policy
+            pending: list[tuple[float, bytes]] = []
+            try:
+                while True:
+                    if (block := audio_queue.get_nowait()) is None: # stopped, the audio isn't needed anymore
+                        self._stop_decoder(audio_queue)
+                        return
+                    pending.append(block)
+                    if self.overflow_policy == AudioOverflowPolicy.drop_oldest:
+                        break
+            except Empty:
+                pass
+            
+            if not pending:
+                continue # the decoder took blocks meanwhile
+            
+            if self.overflow_policy == AudioOverflowPolicy.drop_oldest:
+                self.dropped_frames += len(pending[0][1]) // self.bytes_per_frame
+            else: # coalesce, keep the capture time of the oldest block
+                item = (pending[0][0], b''.join(block for _, block in pending) + data)
@@ -9,7 +9,7 @@ from ..core import (
     ResponseStatus,
     Pattern
 )
-from ..interfaces.protocols import SpeechRecognizer, SpeechRecognizerDelegate, SpeechSynthesizer
+from ..interfaces.protocols import SpeechRecognizer, SpeechRecognizerDelegate, SpeechSynthesizer, SpeechSynthesizerStreaming
 from .mode import Mode
 
 
@@ -132,6 +132,9 @@ class VoiceAssistant(SpeechRecognizerDelegate, CommandsContextDelegate):
         if response.voice:
             was_recognizing = self.speech_recognizer.is_recognizing
             self.speech_recognizer.is_recognizing = False
-            speech = await self.speech_synthesizer.synthesize(response.voice)
+            if isinstance(self.speech_synthesizer, SpeechSynthesizerStreaming):
+                speech = await self.speech_synthesizer.synthesize_stream(response.voice)
+            else:
+                speech = await self.speech_synthesizer.synthesize(response.voice)
             await speech.play()
             self.speech_recognizer.is_recognizing = was_recognizing
\ No newline at end of file
@@ -4,6 +4,7 @@ import contextlib
 import pytest
 import asyncer
 import anyio
+import trio.testing
 from stark.general.dependencies import DependencyManager
 from stark.core import (
     CommandsManager,
@@ -54,6 +55,12 @@ class SpeechSynthesizerMock:
         self.results.append(result)
         return result
 
+@pytest.fixture
+def autojump_clock():
+    # sync commands run in worker threads that wake the event loop from outside, 
+    # so wait a bit of real time before jumping the virtual time when all tasks are idle
+    return trio.testing.MockClock(autojump_threshold = 0.01)
+
 @pytest.fixture
 async def commands_context_flow():
     @contextlib.asynccontextmanager
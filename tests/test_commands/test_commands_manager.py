@@ -106,3 +106,83 @@ def test_manager_get_command_by_name():
     assert manager.get_by_name('TestManager.test3') == test3
     assert manager.get_by_name('test5') == None
     assert manager.get_by_name('Child.test5') == test5
+    
+@pytest.mark.parametrize('options', [{'use_pattern_index': True}, {'batch_parsing': True}])
+async def test_search_options(options):
+    optimized_manager = CommandsManager(**options)
+    manager = CommandsManager()
+    
+    for m in (optimized_manager, manager):
+        
+        @m.new('test')
+        def test(): pass
+        
+        @m.new('hello $name:Word $surname:Word')
+        def hello2(name: Word, surname: Word): pass
+        
+        @m.new('hello $name:Word')
+        def hello(name: Word): pass
+        
+        @m.new('lorem * dolor')
+        def lorem(): pass
+        
+    for string in ['test', 'hello world', 'hello new world', 'lorem ipsum dolor test', 'foo bar', 'hello world test hello foo bar']:
+        optimized_result = await optimized_manager.search(string)
+        result = await manager.search(string)
+        assert [(r.command.pattern, r.match_result) for r in optimized_result] == [(r.command.pattern, r.match_result) for r in result]
+        
+async def test_pattern_index_rebuild():
+    manager = CommandsManager(use_pattern_index = True)
+    child = CommandsManager('Child')
+    
+    @manager.new('test')
+    def test(): pass
+    
+    assert not await manager.search('foo bar')
+    index = manager._pattern_index
+    
+    # reused while commands don't change
+    assert (await manager.search('test'))[0].command == test
+    assert manager._pattern_index is index
+    
+    @manager.new('foo *')
+    def foo(): pass
+    
+    assert (await manager.search('foo bar'))[0].command == foo
+    assert manager._pattern_index is not index
+    index = manager._pattern_index
+    
+    @child.new('baz')
+    def baz(): pass
+    
+    manager.extend(child)
+    
+    assert (await manager.search('baz'))[0].command == baz
+    assert manager._pattern_index is not index
+    index = manager._pattern_index
+    
+    # commands out of the index are always candidates
+    @manager.new('hidden', hidden = True)
+    def hidden(): pass
+    
+    assert (await manager.search('hidden', [test, hidden]))[0].command == hidden
+    assert manager._pattern_index is index
+    
+def test_response_phrases():
+    manager = CommandsManager()
+    
+    @manager.new('hello', responses = ['Hi!', 'Hello!'])
+    def hello(): pass
+    
+    @manager.new('greet', responses = ['Hi!'])
+    def greet(): pass
+    
+    @manager.new('foo')
+    def foo(): pass
+    
+    @manager.new('hidden', hidden = True, responses = ['Hidden'])
+    def hidden(): pass
+    
+    assert hello.responses == ['Hi!', 'Hello!']
+    assert foo.responses == []
+    assert manager.get_response_phrases() == ['Hi!', 'Hello!']
@@ -125,3 +125,18 @@ async def test_exception_in_command():
     #     await foo()
     
     assert (await foo()).status == ResponseStatus.error
+    
+async def test_sync_command_filters_parameters():
+    manager = CommandsManager()
+
+    @manager.new('foo')
+    def foo(name: str) -> Response:
+        text = f'foo {name}!' # local variable is not a parameter
+        return Response(text = text)
+    
+    @manager.new('bar')
+    def bar(**kwargs) -> Response:
+        return Response(text = ' '.join(sorted(kwargs)))
+    
+    assert (await foo(name = 'bar', text = 'ignored', extra = 1)).text == 'foo bar!'
+    assert (await bar({'a': 1}, b = 2)).text == 'a b'
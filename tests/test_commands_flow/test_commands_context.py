@@ -1,5 +1,6 @@
 import pytest
 import anyio
+from stark.general.cache import LRUCache
 
 
 async def test_basic_search(commands_context_flow_filled, autojump_clock):
@@ -79,3 +80,44 @@ async def test_repeat_last_answer_response_action(commands_context_flow_filled,
         await anyio.sleep(5)
         assert len(context_delegate.responses) == 1
         assert context_delegate.responses[0].text == 'Hello, world!'
+
+async def test_search_cache(commands_context_flow_filled, autojump_clock):
+    async with commands_context_flow_filled() as (context, context_delegate):
+        context.search_cache = LRUCache(maxsize = 2)
+        
+        await context.process_string('hello world')
+        await anyio.sleep(5)
+        assert context.search_cache.misses == 1
+        assert context_delegate.responses.pop().text == 'Hello, world!'
+        
+        context.pop_to_root_context()
+        await context.process_string(' hello  world ')
+        await anyio.sleep(5)
+        assert context.search_cache.hits == 1
+        assert context_delegate.responses.pop().text == 'Hello, world!'
+        
+        # cached parameters are copied
+        cached_results = await context._search('hello world', context.commands_manager.commands)
+        cached_results[0].match_result.parameters['name'].value = 'changed'
+        assert (await context._search('hello world', context.commands_manager.commands))[0].match_result.parameters['name'].value == 'world'
+        
+        # positions of cached results refer to the searched string
+        result = (await context._search(' hello  world ', context.commands_manager.commands))[0].match_result
+        assert (result.start, result.end, result.substring) == (1, 13, 'hello  world')
+        
+        # new commands change manager version
+        @context.commands_manager.new('hello there')
+        def hello_there(): pass
+        
+        await context._search('hello world', context.commands_manager.commands)
+        assert context.search_cache.misses == 2
+        assert len(context.search_cache) == 2
+        
+async def test_search_cache_ttl(commands_context_flow_filled, autojump_clock):
+    async with commands_context_flow_filled() as (context, context_delegate):
+        context.search_cache = LRUCache(ttl = 0)
+        
+        await context.process_string('test')
+        await context.process_string('test')
+        assert context.search_cache.hits == 0
+        assert context.search_cache.misses == 2
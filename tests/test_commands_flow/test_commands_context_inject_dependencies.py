@@ -1,5 +1,6 @@
 import anyio
 from stark.core import AsyncResponseHandler, Response
+from stark.general.dependencies import DependencyScope
 
 
 async def test_commands_context_inject_dependencies(commands_context_flow, autojump_clock):
@@ -17,3 +18,33 @@ async def test_commands_context_inject_dependencies(commands_context_flow, autoj
         
         assert len(context_delegate.responses) == 1
         assert context_delegate.responses[0].text == 'foo!'
+        
+async def test_commands_context_provided_dependencies(commands_context_flow, autojump_clock):
+    async with commands_context_flow() as (manager, context, context_delegate):
+        events = []
+        
+        class Session: pass
+        
+        async def make_session():
+            events.append('open')
+            yield Session()
+            events.append('close')
+            
+        context.dependency_manager.add_provider(None, Session, make_session, DependencyScope.utterance)
+        
+        @manager.new('foo')
+        async def foo(session: Session) -> Response: 
+            return Response(text = f'foo {type(session).__name__}')
+        
+        @manager.new('bar')
+        async def bar(session: Session) -> Response: 
+            await anyio.sleep(1)
+            return Response(text = f'bar {type(session).__name__}')
+        
+        await context.process_string('foo bar')
+        await anyio.sleep(0.5)
+        assert events == ['open']
+        
+        await anyio.sleep(1)
+        assert events == ['open', 'close']
+        assert {r.text for r in context_delegate.responses} == {'foo Session', 'bar Session'}
@@ -103,3 +103,16 @@ async def test_command_multiple_respond(commands_context_flow, autojump_clock):
             
         assert len(context_delegate.responses) == 5
         assert [r.text for r in context_delegate.responses] == [f'foo{i}' for i in range(5)]
+
+async def test_respond_wakes_response_handling(commands_context_flow):
+    async with commands_context_flow() as (manager, context, context_delegate):
+        
+        await anyio.wait_all_tasks_blocked() # handle_responses is waiting for responses
+        
+        for text in ['first', 'second', 'third']:
+            await context.respond(Response(text = text))
+            
+        await anyio.wait_all_tasks_blocked()
+        
+        # delivered without polling delay and in order
+        assert [r.text for r in context_delegate.responses] == ['first', 'second', 'third']
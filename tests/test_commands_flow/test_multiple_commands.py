@@ -69,6 +69,23 @@ async def test_overlapping_commands_priority_cut(commands_context_flow, autojump
     assert len(result) == 2
     assert result[0].match_result.substring == 'foo bar'
     assert result[1].match_result.substring == 'test baz'
+    assert (result[1].match_result.start, result[1].match_result.end) == (8, 16)
+
+async def test_overlapping_commands_chain(commands_context_flow, autojump_clock):
+    manager = CommandsManager()
+    
+    @manager.new('foo bar')
+    def foobar(): pass
+    
+    @manager.new('bar baz')
+    def barbaz(): pass
+    
+    @manager.new('baz qux')
+    def bazqux(): pass
+    
+    result = await manager.search('foo bar baz qux')
+    assert [r.command for r in result] == [foobar, bazqux]
+    assert [r.match_result.substring for r in result] == ['foo bar', 'baz qux']
 
 async def test_overlapping_commands_remove(commands_context_flow, autojump_clock):
     manager = CommandsManager()
@@ -0,0 +1,97 @@
+from stark.general.dependencies import DependencyManager, DependencyScope, ScopedDependencies
+
+
+class Database: pass
+class Cache: pass
+
+def test_resolve():
+    manager = DependencyManager()
+    db = Database()
+    main_cache, other_cache = Cache(), Cache()
+    
+    manager.add_dependency(None, Database, db)
+    manager.add_dependency(None, Cache, other_cache)
+    manager.add_dependency('cache', Cache, main_cache)
+    manager.add_dependency('flag', None, True)
+    
+    def func(db: Database, cache: Cache, second_cache: Cache, flag, other: int): pass
+    
+    # named dependency is more specific than the annotated one
+    assert manager.resolve(func) == {'db': db, 'cache': main_cache, 'second_cache': other_cache, 'flag': True}
+    
+def test_resolve_plan_invalidation():
+    manager = DependencyManager()
+    
+    def func(db: Database): pass
+    
+    assert manager.resolve(func) == {}
+    assert manager.resolve(func) == {}
+    
+    db = Database()
+    manager.add_dependency(None, Database, db)
+    assert manager.resolve(func) == {'db': db}
+    
+    # existing dependency is not replaced
+    manager.add_dependency(None, Database, Database())
+    assert manager.resolve(func) == {'db': db}
+    
+async def test_providers():
+    manager = DependencyManager()
+    events = []
+    
+    async def make_database() -> Database:
+        events.append('db')
+        return Database()
+    
+    def make_cache():
+        events.append('cache open')
+        yield Cache()
+        events.append('cache closed')
+    
+    manager.add_provider(None, Database, make_database)
+    manager.add_provider('cache', None, make_cache, DependencyScope.command)
+    
+    def func(db: Database, cache): pass
+    
+    assert events == [] # lazy
+    assert manager.resolve(func) == {} # not created yet
+    
+    scope = ScopedDependencies()
+    first = await manager.resolve_providers(func, scope)
+    second = await manager.resolve_providers(func, scope)
+    assert events == ['db', 'cache open']
+    assert first['db'] is second['db']
+    assert first['cache'] is second['cache']
+    assert manager.resolve(func) == {'db': first['db']} # created singleton
+    
+    await scope.close()
+    assert events == ['db', 'cache open', 'cache closed']
+    
+    third = await manager.resolve_providers(func, ScopedDependencies())
+    assert third['db'] is first['db']
+    assert third['cache'] is not first['cache']
+    
+async def test_utterance_scope_release():
+    manager = DependencyManager()
+    closed = []
+    
+    async def make_cache():
+        yield Cache()
+        closed.append(True)
+    
+    manager.add_provider(None, Cache, make_cache, DependencyScope.utterance)
+    
+    def func(cache: Cache): pass
+    
+    utterance = ScopedDependencies()
+    utterance.retain()
+    utterance.retain()
+    
+    first = await manager.resolve_providers(func, ScopedDependencies(), utterance)
+    second = await manager.resolve_providers(func, ScopedDependencies(), utterance)
+    assert first['cache'] is second['cache']
+    
+    await utterance.release()
+    assert not closed
+    await utterance.release()
+    assert closed
@@ -0,0 +1,150 @@
+import sys
+import types
+import json
+import pytest
+
+
+# audio devices and speech models are not available in CI, so interfaces are tested with stubs
+
+class PortAudioError(Exception):
+    pass
+
+class RawInputStream:
+    '''Captures nothing, tests put audio to the recognizer directly.'''
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+class OutputStream:
+    '''Collects written audio instead of playing it.'''
+
+    def __init__(self, samplerate: int, channels: int, dtype: str):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.written = []
+
+    def start(self): pass
+    def stop(self): pass
+    def close(self): pass
+    def abort(self): pass
+
+    def write(self, data):
+        self.written.append(data)
+
+class KaldiRecognizer:
+    '''Every non-silent block is a new word, the first silent block after words is an endpoint.'''
+
+    def __init__(self, model, samplerate: int):
+        self.samplerate = samplerate
+        self.blocks: list[bytes] = []
+        self.words: list[str] = []
+
+    def SetMaxAlternatives(self, max_alternatives: int): pass
+    def SetWords(self, words: bool): pass
+    def SetSpkModel(self, model): pass
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        self.blocks.append(data)
+        if data.strip(b'\0'):
+            self.words.append(f'word{len(self.blocks)}')
+            return False
+        return bool(self.words)
+
+    def PartialResult(self) -> str:
+        return json.dumps({'partial': ' '.join(self.words)})
+
+    def Result(self) -> str:
+        text, self.words = ' '.join(self.words), []
+        return json.dumps({'text': text})
+
+    def FinalResult(self) -> str:
+        return self.Result()
+
+class Model:
+    def __init__(self, path: str):
+        self.path = path
+
+def create_sounddevice_stub() -> types.ModuleType:
+    module = types.ModuleType('sounddevice')
+    module.output_streams = []
+    
+    class RecordedOutputStream(OutputStream):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            module.output_streams.append(self)
+    
+    module.PortAudioError = PortAudioError
+    module.RawInputStream = RawInputStream
+    module.OutputStream = RecordedOutputStream
+    module.query_devices = lambda kind = None: {'default_samplerate': 16000.0}
+    module.play = lambda *args, **kwargs: None
+    module.stop = lambda: None
+    return module
+
+def create_vosk_stub() -> types.ModuleType:
+    module = types.ModuleType('vosk')
+    module.SetLogLevel = lambda level: None
+    module.Model = Model
+    module.SpkModel = Model
+    module.KaldiRecognizer = KaldiRecognizer
+    return module
+
+def create_torch_stub() -> types.ModuleType:
+    module = types.ModuleType('torch')
+    module.nn = types.SimpleNamespace(Module = object)
+    module.Tensor = object
+    module.device = str
+    module.backends = types.SimpleNamespace(quantized = types.SimpleNamespace(engine = None))
+    module.set_num_threads = lambda threads: None
+    return module
+
+def create_soundfile_stub() -> types.ModuleType:
+    module = types.ModuleType('soundfile')
+    module.read = lambda file, dtype = 'float64': (None, 0)
+    return module
+
+def create_texttospeech_stub() -> types.ModuleType:
+    module = types.ModuleType('google.cloud.texttospeech')
+    module.TextToSpeechClient = lambda: types.SimpleNamespace(synthesize_speech = None)
+    module.AudioConfig = module.VoiceSelectionParams = module.SynthesisInput = dict
+    module.AudioEncoding = types.SimpleNamespace(LINEAR16 = 'LINEAR16')
+    module.SsmlVoiceGender = types.SimpleNamespace(FEMALE = 'FEMALE')
+    google, cloud = types.ModuleType('google'), types.ModuleType('google.cloud')
+    google.cloud, cloud.texttospeech = cloud, module
+    sys.modules.update({'google': google, 'google.cloud': cloud})
+    return module
+
+# make interfaces importable without the native libraries
+for name, stub in [
+    ('sounddevice', create_sounddevice_stub), ('vosk', create_vosk_stub), ('torch', create_torch_stub),
+    ('soundfile', create_soundfile_stub), ('google.cloud.texttospeech', create_texttospeech_stub),
+]:
+    try:
+        __import__(name)
+    except (ImportError, OSError): # sounddevice raises OSError if PortAudio is missing
+        sys.modules[name] = stub()
+
+@pytest.fixture
+def vosk_stubs(monkeypatch):
+    '''Replaces the libraries used by the Vosk interface with stubs, even if real ones are installed.'''
+    from stark.interfaces import vosk as vosk_interface
+    monkeypatch.setattr(vosk_interface, 'sounddevice', create_sounddevice_stub())
+    monkeypatch.setattr(vosk_interface, 'vosk', create_vosk_stub())
+    return vosk_interface
+
+@pytest.fixture
+def sounddevice_stub(monkeypatch):
+    '''Replaces sounddevice in the speech playback modules, opened output streams are in `output_streams`.'''
+    pytest.importorskip('numpy')
+    from stark.interfaces import speech_stream, speech_cache
+    module = create_sounddevice_stub()
+    monkeypatch.setattr(speech_stream, 'sounddevice', module)
+    monkeypatch.setattr(speech_cache, 'sounddevice', module)
+    return module
@@ -0,0 +1,53 @@
+import io
+import wave
+import pytest
+from stark.interfaces.audio_sources import AudioSource, WavFileSource, RawFileSource, RawStreamSource
+
+
+def write_wav(path, data: bytes, samplerate: int = 16000, channels: int = 1):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(data)
+
+async def test_wav_file_source(tmp_path):
+    data = bytes(range(256)) * 100
+    path = tmp_path / 'audio.wav'
+    write_wav(path, data, samplerate = 8000)
+    
+    source = WavFileSource(str(path), chunk_size = 1000)
+    assert isinstance(source, AudioSource)
+    assert source.samplerate == 8000
+    
+    chunks = [chunk async for chunk in source]
+    assert len(chunks) == 13 # 12800 frames by 1000
+    assert b''.join(chunks) == data
+    
+    # can be read again
+    assert b''.join([chunk async for chunk in source]) == data
+    
+def test_wav_file_source_format(tmp_path):
+    path = tmp_path / 'stereo.wav'
+    write_wav(path, b'\0' * 400, channels = 2)
+    
+    with pytest.raises(AssertionError, match = '16-bit mono'):
+        WavFileSource(str(path))
+    
+async def test_raw_file_source():
+    data = b'\1\2' * 1000
+    source = RawFileSource(io.BytesIO(data), samplerate = 16000, chunk_size = 300)
+    
+    chunks = [chunk async for chunk in source]
+    assert [len(chunk) for chunk in chunks] == [300] * 6 + [200]
+    assert b''.join(chunks) == data
+    
+async def test_raw_stream_source():
+    async def stream():
+        yield b'ab'
+        yield b''
+        yield b'cd'
+    
+    source = RawStreamSource(stream(), samplerate = 16000)
+    assert isinstance(source, AudioSource)
+    assert [chunk async for chunk in source] == [b'ab', b'cd']
@@ -0,0 +1,36 @@
+import os
+import types
+import pytest
+numpy = pytest.importorskip('numpy')
+from stark.interfaces import gcloud
+
+
+@pytest.fixture
+def requests(monkeypatch) -> list[str]:
+    '''Texts requested from Google Cloud, the response audio is decoded by a stub.'''
+    monkeypatch.setenv('GOOGLE_APPLICATION_CREDENTIALS', '') # restored after the test, the synthesizer sets it
+    requests: list[str] = []
+    
+    def synthesize_speech(input, voice, audio_config):
+        requests.append(input['text'])
+        return types.SimpleNamespace(audio_content = b'')
+    
+    monkeypatch.setattr(gcloud.texttospeech, 'TextToSpeechClient', lambda: types.SimpleNamespace(synthesize_speech = synthesize_speech))
+    monkeypatch.setattr(gcloud.soundfile, 'read', lambda file, dtype: (numpy.zeros(800, dtype = numpy.float32), 8000))
+    return requests
+
+async def test_cached_by_default(tmp_path, requests):
+    synthesizer = gcloud.GCloudSpeechSynthesizer('voice', 'en-US', 'key.json', cache_directory = str(tmp_path))
+    
+    first = await synthesizer.synthesize('hello')
+    second = await synthesizer.synthesize('hello')
+    assert requests == ['hello']
+    assert second.sample_rate == first.sample_rate == 8000
+    assert any(name.endswith('.wav') for name in os.listdir(tmp_path))
+    
+async def test_cache_disabled(requests):
+    synthesizer = gcloud.GCloudSpeechSynthesizer('voice', 'en-US', 'key.json', cache_directory = None)
+    
+    await synthesizer.synthesize('hello')
+    await synthesizer.synthesize('hello')
+    assert requests == ['hello', 'hello']
@@ -0,0 +1,54 @@
+import time
+import anyio
+import pytest
+from stark.interfaces.protocols import LazyLoading
+from stark.interfaces.lazy_loading import LazyLoader
+
+
+class ModelMock(LazyLoader):
+    
+    def __init__(self):
+        self.loads = 0
+        
+    def _load(self):
+        time.sleep(0.1) # blocking, like loading model files
+        self.loads += 1
+
+async def test_lazy_loading():
+    model = ModelMock()
+    assert isinstance(model, LazyLoading)
+    assert not model.is_ready
+    
+    # concurrent loads wait for the same loading, the event loop isn't blocked meanwhile
+    ticks = 0
+    async def tick():
+        nonlocal ticks
+        while not model.is_ready:
+            ticks += 1
+            await anyio.sleep(0.01)
+    
+    async with anyio.create_task_group() as group:
+        group.start_soon(tick)
+        for _ in range(3):
+            group.start_soon(model.load)
+            
+    assert model.is_ready
+    assert model.loads == 1
+    assert ticks > 1
+    
+    await model.load()
+    assert model.loads == 1
+    
+def test_load_sync():
+    model = ModelMock()
+    model.load_sync()
+    model.load_sync()
+    assert model.is_ready
+    assert model.loads == 1
+    
+def test_load_is_abstract():
+    class Incomplete(LazyLoader):
+        pass
+    
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,83 @@
+import time
+import threading
+import anyio
+import pytest
+numpy = pytest.importorskip('numpy')
+from stark.interfaces.silero import SileroSpeechSynthesizer
+
+
+class ModelMock:
+    
+    def __init__(self):
+        self.calls: list[str] = []
+        self.threads: set[int] = set()
+        self.running = 0
+        self.max_running = 0
+        
+    def apply_tts(self, text: str, speaker: str, sample_rate: int):
+        self.calls.append(text)
+        self.threads.add(threading.get_ident())
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05) # blocking, like the real inference
+        self.running -= 1
+        return numpy.zeros(len(text))
+
+@pytest.fixture
+def synthesizer():
+    synthesizer = SileroSpeechSynthesizer('https://example.com/model.pt', lazy = True)
+    synthesizer.model = ModelMock()
+    synthesizer.is_ready = True
+    return synthesizer
+
+async def test_inferences_run_one_by_one(synthesizer):
+    results = {}
+    
+    async def synthesize(text: str):
+        results.setdefault(text, []).append(await synthesizer.synthesize(text))
+    
+    async with anyio.create_task_group() as group:
+        for text in ['one', 'two', 'one', 'three']:
+            group.start_soon(synthesize, text)
+        await anyio.sleep(0.01)
+        assert synthesizer.queue_depth == 3
+            
+    model = synthesizer.model
+    assert sorted(model.calls) == ['one', 'three', 'two'] # identical requests share one inference
+    assert model.max_running == 1
+    assert threading.get_ident() not in model.threads
+    assert [len(speech.audio) for speech in results['one']] == [3, 3]
+    assert synthesizer.queue_depth == 0
+    
+async def test_cancelled_request_is_dropped(synthesizer):
+    async with anyio.create_task_group() as group:
+        group.start_soon(synthesizer.synthesize, 'one')
+        await anyio.sleep(0.01)
+        with anyio.move_on_after(0.01):
+            await synthesizer.synthesize('two') # queued behind 'one'
+            
+    assert synthesizer.model.calls == ['one']
+    assert synthesizer.queue_depth == 0
+    
+async def test_inference_error(synthesizer):
+    def apply_tts(text: str, speaker: str, sample_rate: int):
+        raise ValueError(text)
+    
+    synthesizer.model.apply_tts = apply_tts
+    
+    with pytest.raises(ValueError, match = 'one'):
+        await synthesizer.synthesize('one')
+    assert synthesizer.queue_depth == 0
+    
+async def test_live_requests_go_first(synthesizer):
+    async with anyio.create_task_group() as group:
+        group.start_soon(synthesizer.synthesize_background, 'one')
+        await anyio.sleep(0.01) # running
+        group.start_soon(synthesizer.synthesize_background, 'two')
+        group.start_soon(synthesizer.synthesize_background, 'three')
+        await anyio.sleep(0.01)
+        group.start_soon(synthesizer.synthesize, 'four')
+        group.start_soon(synthesizer.synthesize, 'three') # the same background request becomes live
+        
+    calls = synthesizer.model.calls
+    assert calls[0] == 'one' and set(calls[1:3]) == {'four', 'three'} and calls[3] == 'two'
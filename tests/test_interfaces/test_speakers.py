@@ -0,0 +1,84 @@
+import pytest
+numpy = pytest.importorskip('numpy')
+from stark.general.dependencies import DependencyManager, ScopedDependencies
+from stark.interfaces.speakers import Speaker, SpeakerStore, add_speaker_provider
+
+
+def random_vectors(count: int, dimension: int = 8, seed: int = 0):
+    return numpy.random.default_rng(seed).normal(size = (count, dimension)).astype(numpy.float32)
+
+def test_identify():
+    store = SpeakerStore(dimension = 8, threshold = 0.9, capacity = 2)
+    vectors = random_vectors(5)
+    
+    # new speakers, the store grows beyond the initial capacity
+    assert [store.identify(vector).id for vector in vectors] == [0, 1, 2, 3, 4]
+    assert len(store) == 5
+    
+    # similar vector matches the same speaker and moves its centroid
+    speaker = store.identify(vectors[3] * 2 + 0.01)
+    assert speaker.id == 3
+    assert speaker.similarity > 0.99
+    assert len(store) == 5
+    
+def test_search_batch():
+    store = SpeakerStore(dimension = 8)
+    ids, similarities = store.search(random_vectors(3))
+    assert list(ids) == [-1, -1, -1]
+    
+    vectors = random_vectors(4)
+    for vector in vectors:
+        store.add(vector)
+    
+    ids, similarities = store.search(vectors[::-1])
+    assert list(ids) == [3, 2, 1, 0]
+    assert numpy.allclose(similarities, 1)
+    
+def test_centroid():
+    store = SpeakerStore(dimension = 2, threshold = 0.5)
+    assert store.identify([1, 0]) == Speaker(0, 1)
+    assert store.identify([0, 3]) == Speaker(1, 1) # orthogonal, new speaker
+    
+    # centroid is the mean direction of normalized vectors
+    speaker = store.identify([2, 1])
+    assert speaker.id == 0
+    assert speaker.similarity == pytest.approx(2 / numpy.sqrt(5))
+    expected = numpy.array([1 + 2 / numpy.sqrt(5), 1 / numpy.sqrt(5)])
+    assert numpy.allclose(store.centroids[0], expected / numpy.linalg.norm(expected))
+    
+def test_persistence(tmp_path):
+    path = str(tmp_path / 'speakers.npy')
+    vectors = random_vectors(5)
+    
+    store = SpeakerStore(path, dimension = 8, capacity = 2)
+    for vector in vectors:
+        store.add(vector)
+    store.update(1, vectors[0])
+    del store
+    
+    store = SpeakerStore(path, dimension = 8)
+    assert len(store) == 5
+    ids, _ = store.search(vectors[2:])
+    assert list(ids) == [2, 3, 4]
+    
+    with pytest.raises(AssertionError):
+        SpeakerStore(path, dimension = 16)
+    
+async def test_speaker_provider():
+    class Recognizer:
+        last_speaker: Speaker | None = None
+    
+    recognizer = Recognizer()
+    dependency_manager = DependencyManager()
+    add_speaker_provider(dependency_manager, recognizer)
+    
+    def command(speaker: Speaker): pass
+    
+    recognizer.last_speaker = Speaker(1, 0.9)
+    utterance_scope = ScopedDependencies()
+    assert await dependency_manager.resolve_providers(command, ScopedDependencies(), utterance_scope) == {'speaker': Speaker(1, 0.9)}
+    
+    # same utterance keeps its speaker
+    recognizer.last_speaker = Speaker(2, 0.8)
+    assert await dependency_manager.resolve_providers(command, ScopedDependencies(), utterance_scope) == {'speaker': Speaker(1, 0.9)}
+    assert await dependency_manager.resolve_providers(command, ScopedDependencies(), ScopedDependencies()) == {'speaker': Speaker(2, 0.8)}
@@ -0,0 +1,154 @@
+import os
+import anyio
+import pytest
+numpy = pytest.importorskip('numpy')
+from stark.interfaces.protocols import SpeechSynthesizerResult
+from stark.interfaces.speech_cache import CachedSpeech, CachedSpeechSynthesizer
+
+
+def wav_files(path) -> list[str]:
+    return [name for name in os.listdir(path) if name.endswith('.wav')]
+
+class SynthesizerMock:
+    
+    voice = 'mock'
+    sample_rate = 8000
+    calls: list[str]
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def synthesize(self, text: str) -> CachedSpeech:
+        self.calls.append(text)
+        return CachedSpeech(numpy.linspace(-1, 1, 800 * len(text), dtype = numpy.float32), self.sample_rate)
+    
+async def test_cache_hits(tmp_path):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    
+    speech = await cache.synthesize('hello')
+    assert await cache.synthesize('hello') is speech # memory
+    assert synthesizer.calls == ['hello']
+    
+    # disk survives restart
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    restored = await cache.synthesize('hello')
+    assert synthesizer.calls == ['hello']
+    assert restored.sample_rate == 8000
+    assert numpy.allclose(restored.audio, speech.audio, atol = 1e-4)
+    
+async def test_cache_key(tmp_path):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    
+    # long phrases with the same prefix don't collide
+    await cache.synthesize('a' * 200 + 'b')
+    await cache.synthesize('a' * 200 + 'c')
+    synthesizer.voice = 'other'
+    await cache.synthesize('a' * 200 + 'b')
+    assert len(synthesizer.calls) == 3
+    assert len(wav_files(tmp_path)) == 3
+    
+async def test_disk_eviction(tmp_path):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path), max_disk_size = 5000, memory_size = 1)
+    
+    await cache.synthesize('one') # 4800 bytes of frames + header
+    await cache.synthesize('two') # evicts 'one'
+    assert len(wav_files(tmp_path)) == 1
+    
+    await cache.synthesize('two')
+    await cache.synthesize('one')
+    assert synthesizer.calls == ['one', 'two', 'one']
+    
+async def test_not_cacheable(tmp_path):
+    class Result:
+        async def play(self): pass
+        
+    class Synthesizer:
+        async def synthesize(self, text: str) -> SpeechSynthesizerResult:
+            return Result()
+        
+    cache = CachedSpeechSynthesizer(Synthesizer(), str(tmp_path))
+    assert isinstance(await cache.synthesize('hello'), Result)
+    assert not os.listdir(tmp_path)
+    
+async def test_warm_up(tmp_path):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    
+    await cache.synthesize('recorded')
+    await cache.warm_up(['hello', 'recorded'])
+    assert synthesizer.calls == ['recorded', 'hello']
+    assert cache.key('hello') not in cache.memory_cache # warmed up speeches don't take memory of live ones
+    
+    # recorded phrases are synthesized again for another voice after restart
+    synthesizer.voice = 'other'
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    assert cache.recorded_phrases == ['recorded', 'hello']
+    await cache.warm_up()
+    assert synthesizer.calls == ['recorded', 'hello', 'recorded', 'hello']
+    
+    await cache.synthesize('hello')
+    assert len(synthesizer.calls) == 4
+    
+async def test_warm_up_waits_for_live_synthesis(tmp_path):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    live_started = anyio.Event()
+    release_live = anyio.Event()
+    original_synthesize = synthesizer.synthesize
+    
+    async def synthesize(text: str):
+        if text == 'live':
+            live_started.set()
+            await release_live.wait()
+        return await original_synthesize(text)
+    
+    synthesizer.synthesize = synthesize
+    
+    async with anyio.create_task_group() as group:
+        group.start_soon(cache.synthesize, 'live')
+        await live_started.wait()
+        group.start_soon(cache.warm_up, ['background'])
+        await anyio.sleep(1)
+        assert synthesizer.calls == []
+        release_live.set()
+        
+    assert synthesizer.calls == ['live', 'background']
+    
+async def test_concurrent_warm_ups(tmp_path, autojump_clock):
+    synthesizer = SynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    release_live = anyio.Event()
+    original_synthesize = synthesizer.synthesize
+    
+    async def synthesize(text: str):
+        if text == 'live':
+            await release_live.wait()
+        return await original_synthesize(text)
+    
+    synthesizer.synthesize = synthesize
+    
+    with anyio.fail_after(10):
+        async with anyio.create_task_group() as group:
+            group.start_soon(cache.synthesize, 'live')
+            await anyio.sleep(1)
+            group.start_soon(cache.warm_up, ['first'])
+            group.start_soon(cache.warm_up, ['second'])
+            await anyio.sleep(1)
+            release_live.set()
+        
+    assert sorted(synthesizer.calls) == ['first', 'live', 'second'] # both warm-ups continue after the live synthesis
+    
+async def test_warm_up_in_background(tmp_path):
+    class BackgroundSynthesizerMock(SynthesizerMock):
+        async def synthesize_background(self, text: str) -> CachedSpeech:
+            return await super().synthesize(f'background {text}')
+    
+    synthesizer = BackgroundSynthesizerMock()
+    cache = CachedSpeechSynthesizer(synthesizer, str(tmp_path))
+    
+    await cache.warm_up(['hello'])
+    await cache.synthesize('live')
+    assert synthesizer.calls == ['background hello', 'live']
@@ -0,0 +1,64 @@
+import pytest
+import anyio
+numpy = pytest.importorskip('numpy')
+from stark.interfaces.speech_stream import StreamingSpeech, split_sentences
+
+
+def test_split_sentences():
+    assert split_sentences('') == []
+    assert split_sentences('Hello world') == ['Hello world']
+    assert split_sentences('This is the first sentence. And this is the second one! Is it the third?') == [
+        'This is the first sentence.', 'And this is the second one!', 'Is it the third?'
+    ]
+    # short sentences are joined
+    assert split_sentences('Hi! Ok. This is a longer sentence. Bye.') == ['Hi! Ok. This is a longer sentence.', 'Bye.']
+    
+async def test_next_sentence_is_synthesized_during_playback(autojump_clock):
+    events: list[str] = []
+    
+    class Result: # not an audio result, played by itself
+        def __init__(self, text: str):
+            self.text = text
+        
+        async def play(self):
+            events.append(f'play {self.text}')
+            await anyio.sleep(1)
+            events.append(f'played {self.text}')
+            
+    class Synthesizer:
+        async def synthesize(self, text: str) -> Result:
+            events.append(f'synthesize {text}')
+            await anyio.sleep(0.1)
+            return Result(text)
+        
+    await StreamingSpeech(Synthesizer(), ['one', 'two', 'three']).play()
+    
+    assert events == [
+        'synthesize one',
+        'synthesize two', 'play one', # 'two' is ready before 'one' is played
+        'synthesize three', 'played one', 'play two',
+        'played two', 'play three',
+        'played three'
+    ]
+    
+async def test_audio_is_written_to_one_stream(sounddevice_stub):
+    class Speech:
+        def __init__(self, audio, sample_rate: int):
+            self.audio = audio
+            self.sample_rate = sample_rate
+            
+        async def play(self):
+            raise AssertionError('audio results must be written to the output stream')
+            
+    class Synthesizer:
+        async def synthesize(self, text: str) -> Speech:
+            sample_rate = 8000 if text == 'three' else 16000
+            return Speech(numpy.zeros(len(text) * 100), sample_rate)
+        
+    await StreamingSpeech(Synthesizer(), ['one', 'two', '', 'three']).play()
+    
+    # the stream is reopened only for another sample rate, empty audio is skipped
+    first, second = sounddevice_stub.output_streams
+    assert (first.samplerate, second.samplerate) == (16000, 8000)
+    assert [len(audio) for audio in first.written] == [300, 300]
+    assert [len(audio) for audio in second.written] == [500]
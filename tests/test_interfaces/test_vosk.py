@@ -0,0 +1,254 @@
+import threading
+import anyio
+import pytest
+
+
+SPEECH = b'\1\0' * 1600 # 1600 frames
+SILENCE = b'\0\0' * 1600
+
+class DelegateMock:
+
+    def __init__(self):
+        self.partial_results: list[str] = []
+        self.final_results: list[str] = []
+        self.empty_results = 0
+
+    async def speech_recognizer_did_receive_final_result(self, result: str):
+        self.final_results.append(result)
+
+    async def speech_recognizer_did_receive_partial_result(self, result: str):
+        self.partial_results.append(result)
+
+    async def speech_recognizer_did_receive_empty_result(self):
+        self.empty_results += 1
+
+async def wait_until(condition):
+    with anyio.fail_after(5):
+        while not condition():
+            await anyio.sleep(0.01)
+
+@pytest.fixture
+def recognizer(vosk_stubs):
+    recognizer = vosk_stubs.VoskSpeechRecognizer('https://example.com/model.zip', lazy = True)
+    recognizer._vosk_model = vosk_stubs.vosk.Model('model')
+    recognizer._speaker_model = None
+    recognizer.kaldiRecognizer = recognizer._create_kaldi_recognizer(recognizer.samplerate)
+    recognizer.is_ready = True
+    recognizer.delegate = DelegateMock()
+    return recognizer
+
+async def test_decoder_thread(recognizer):
+    decoder_threads = set()
+    accept_waveform = recognizer.kaldiRecognizer.AcceptWaveform
+
+    def AcceptWaveform(data: bytes) -> bool:
+        decoder_threads.add(threading.get_ident())
+        return accept_waveform(data)
+
+    recognizer.kaldiRecognizer.AcceptWaveform = AcceptWaveform
+
+    with anyio.fail_after(5):
+        async with anyio.create_task_group() as group:
+            group.start_soon(recognizer.start_listening)
+
+            for data in [SPEECH, SPEECH, SILENCE]:
+                recognizer._put_audio(data)
+
+            await wait_until(lambda: recognizer.delegate.final_results)
+            recognizer.stop_listening()
+
+    assert recognizer.delegate.partial_results == ['word1', 'word1 word2']
+    assert recognizer.delegate.final_results == ['word1 word2']
+    assert recognizer.last_result == 'word1 word2'
+    # decoding doesn't block the event loop
+    assert decoder_threads and threading.get_ident() not in decoder_threads
+
+async def test_stop_listening_wakes_decoder(recognizer):
+    for _ in range(2): # can listen again after stop
+        with anyio.fail_after(5):
+            async with anyio.create_task_group() as group:
+                group.start_soon(recognizer.start_listening)
+                await anyio.sleep(0.1) # the decoder waits for audio
+                recognizer.stop_listening()
+
+        assert not recognizer._is_listening
+
+    # audio of the previous listening isn't decoded by the next one
+    recognizer._put_audio(SPEECH)
+    recognizer.stop_listening()
+    assert recognizer.audio_queue.empty()
+
+async def test_cancellation_stops_decoder(recognizer):
+    decoder_finished = threading.Event()
+    decode = recognizer._decode
+
+    def _decode(*args):
+        try:
+            decode(*args)
+        finally:
+            decoder_finished.set()
+
+    recognizer._decode = _decode
+
+    with anyio.move_on_after(0.1):
+        await recognizer.start_listening()
+
+    assert not recognizer._is_listening
+    assert await anyio.to_thread.run_sync(decoder_finished.wait, 5) # the abandoned thread isn't blocked forever
+
+@pytest.mark.parametrize('policy, expected_blocks, dropped_frames', [
+    ('drop_oldest', [b'\2\0', b'\3\0'], 1),
+    ('coalesce', [b'\1\0\2\0\3\0'], 0),
+])
+def test_overflow_policies(recognizer, vosk_stubs, policy, expected_blocks, dropped_frames):
+    recognizer.overflow_policy = vosk_stubs.AudioOverflowPolicy[policy]
+    recognizer.audio_queue = vosk_stubs.Queue(maxsize = 2)
+
+    for data in [b'\1\0', b'\2\0', b'\3\0']:
+        recognizer._put_audio(data)
+
+    blocks = [recognizer.audio_queue.get_nowait() for _ in range(recognizer.audio_queue.qsize())]
+    assert [data for _, data in blocks] == expected_blocks
+    assert recognizer.dropped_frames == dropped_frames
+
+async def test_block_policy(recognizer, vosk_stubs):
+    recognizer.overflow_policy = vosk_stubs.AudioOverflowPolicy.block
+    recognizer.audio_queue = vosk_stubs.Queue(maxsize = 1)
+    recognizer._put_audio(b'\1\0')
+
+    async with anyio.create_task_group() as group:
+        group.start_soon(anyio.to_thread.run_sync, recognizer._put_audio, b'\2\0')
+        await anyio.sleep(0.1)
+        assert recognizer.audio_queue.full() # the audio input waits for the decoder
+        assert recognizer.audio_queue.get_nowait()[1] == b'\1\0'
+
+    assert recognizer.audio_queue.get_nowait()[1] == b'\2\0'
+    assert recognizer.dropped_frames == 0
+
+def test_coalesce_keeps_stop_signal(recognizer, vosk_stubs):
+    recognizer.overflow_policy = vosk_stubs.AudioOverflowPolicy.coalesce
+    recognizer.audio_queue = vosk_stubs.Queue(maxsize = 2)
+    recognizer.audio_queue.put_nowait((0.0, b'\1\0'))
+    recognizer.audio_queue.put_nowait(None) # stopped while the queue is full
+
+    recognizer._put_audio(b'\2\0')
+    assert recognizer.audio_queue.get_nowait() is None
+    assert recognizer.audio_queue.empty()
+
+def test_adaptive_blocksize(recognizer, vosk_stubs):
+    recognizer.adaptive_blocksize = True
+    assert recognizer.sounddevice_parameters['blocksize'] == recognizer.speech_blocksize
+    audio_queue = vosk_stubs.Queue()
+
+    for i in range(10):
+        audio_queue.put_nowait((float(i), SILENCE))
+
+    # silence: small blocks are merged up to silence_blocksize
+    capture_time, data = recognizer._next_block(audio_queue)
+    assert len(data) == recognizer.silence_blocksize * recognizer.bytes_per_frame
+    assert capture_time == 4.0 # of the last merged block
+
+    # speech: blocks are decoded as they come
+    recognizer._speech_active = True
+    assert recognizer._next_block(audio_queue) == (5.0, SILENCE)
+
+    # the stop signal ends merging and stays for the decoding loop
+    recognizer._speech_active = False
+    audio_queue.put_nowait(None)
+    capture_time, data = recognizer._next_block(audio_queue)
+    assert (capture_time, len(data)) == (9.0, 4 * len(SILENCE))
+    assert recognizer._next_block(audio_queue) is None
+
+async def test_final_result_latency(recognizer, vosk_stubs):
+    await recognizer._handle_result(False, '{"partial": "hello"}', vosk_stubs.time.monotonic() - 1)
+    assert recognizer._speech_active
+
+    await recognizer._handle_result(False, '{"partial": "hello"}', vosk_stubs.time.monotonic()) # not changed
+    await recognizer._handle_result(True, '{"text": "hello"}', vosk_stubs.time.monotonic())
+    assert not recognizer._speech_active
+    assert 1 <= recognizer.final_result_latency < 2 # since the last change of the partial result
+    assert recognizer.max_final_result_latency == recognizer.final_result_latency
+    assert recognizer.delegate.final_results == ['hello']
+
+async def test_transcribe_aligns_samples(recognizer, vosk_stubs):
+    from stark.interfaces.audio_sources import RawStreamSource
+
+    kaldi_recognizers = []
+    create_kaldi_recognizer = recognizer._create_kaldi_recognizer
+
+    def _create_kaldi_recognizer(samplerate: int):
+        kaldi_recognizers.append(create_kaldi_recognizer(samplerate))
+        return kaldi_recognizers[-1]
+
+    recognizer._create_kaldi_recognizer = _create_kaldi_recognizer
+    recognizer.blocksize = 1600
+
+    async def chunks():
+        for chunk in [SPEECH[:3], SPEECH[3:], SPEECH[:-1], b'\0', SILENCE, b'\1']: # split in the middle of samples
+            yield chunk
+
+    with anyio.fail_after(5):
+        await recognizer.transcribe(RawStreamSource(chunks(), 8000))
+
+    blocks = kaldi_recognizers[0].blocks
+    assert all(len(block) % recognizer.bytes_per_frame == 0 for block in blocks)
+    assert b''.join(blocks) == SPEECH + SPEECH[:-1] + b'\0' + SILENCE # the incomplete last sample is dropped
+    assert len(recognizer.delegate.final_results) == 1
+
+async def test_transcribe_cancellation(recognizer):
+    from stark.interfaces.audio_sources import RawStreamSource
+
+    decoder_finished = threading.Event()
+    decode = recognizer._decode
+
+    def _decode(*args):
+        try:
+            decode(*args)
+        finally:
+            decoder_finished.set()
+
+    recognizer._decode = _decode
+
+    async def endless_speech():
+        while True:
+            yield SPEECH
+            await anyio.sleep(0.01)
+
+    with anyio.move_on_after(0.1):
+        await recognizer.transcribe(RawStreamSource(endless_speech(), 16000))
+
+    assert await anyio.to_thread.run_sync(decoder_finished.wait, 5)
+
+def test_final_result_mbr(vosk_stubs):
+    result = vosk_stubs.KaldiFinalResult.from_json('''{
+        "text": "hello world",
+        "result": [
+            {"word": "hello", "start": 0.1, "end": 0.5, "conf": 1.0},
+            {"word": "world", "start": 0.6, "end": 1.0, "conf": 0.5}
+        ],
+        "spk": [0.5, -0.5],
+        "spk_frames": 90
+    }''')
+    assert result.text == 'hello world'
+    assert [word['word'] for word in result.words] == ['hello', 'world']
+    assert result.confidence == 0.75
+    assert result.spk == [0.5, -0.5]
+    
+    # the full schemas are still available
+    raw_json = '{"text": "hi", "spk": [1.0], "spk_frames": 1}'
+    assert vosk_stubs.KaldiMBR.parse_raw(raw_json).text == vosk_stubs.KaldiFinalResult.from_json(raw_json).text == 'hi'
+
+def test_final_result_alternatives(vosk_stubs):
+    result = vosk_stubs.KaldiFinalResult.from_json('''{"alternatives": [
+        {"text": "hello world", "confidence": 250.0, "result": [{"word": "hello", "start": 0.1, "end": 0.5}]},
+        {"text": "hello word", "confidence": 200.0}
+    ]}''')
+    assert result.text == 'hello world'
+    assert result.words == [{'word': 'hello', 'start': 0.1, 'end': 0.5}]
+    assert result.confidence is None # no word confidences in this schema
+    assert result.spk is None
+
+@pytest.mark.parametrize('raw_json', ['{}', '{"text": null, "result": {}, "spk": "x"}', '{"alternatives": []}'])
+def test_final_result_malformed(vosk_stubs, raw_json):
+    result = vosk_stubs.KaldiFinalResult.from_json(raw_json)
+    assert (result.text, result.words, result.spk, result.confidence) == ('', [], None, None)
@@ -0,0 +1,67 @@
+import random
+from stark.core.patterns import ObjectsCache
+from stark.core.patterns.objects_cache import find_contained
+from stark.core.types import Word
+
+
+def test_find_contained():
+    cache = ObjectsCache()
+    cache.linear_scan_limit = 0
+    assert cache.find_contained('foo') is None
+    
+    cache['bar'] = Word('bar')
+    cache['foo bar'] = Word('foo bar')
+    cache['oo'] = Word('oo')
+    
+    assert cache.find_contained('foo bar baz') == ('bar', Word('bar'))
+    assert cache.find_contained('foo baz') == ('oo', Word('oo'))
+    assert cache.find_contained('baz') is None
+    
+    # overwriting keeps the insertion order
+    cache['bar'] = Word('new')
+    assert cache.find_contained('foo bar baz') == ('bar', Word('new'))
+    
+    del cache['bar']
+    assert cache.find_contained('foo bar baz') == ('foo bar', Word('foo bar'))
+    
+    cache.clear()
+    assert cache.find_contained('foo bar baz') is None
+    
+def test_find_contained_same_as_linear_scan():
+    random.seed(0)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'or', 'em', 'm']
+    random_string = lambda n: ' '.join(random.choice(words) for _ in range(n))
+    
+    plain: dict[str, Word] = {}
+    cache = ObjectsCache()
+    cache.linear_scan_limit = 10
+    
+    for _ in range(200):
+        substring = random_string(random.randint(1, 3))
+        plain[substring] = cache[substring] = Word(substring)
+        
+        string = random_string(random.randint(1, 6))
+        assert cache.find_contained(string) == find_contained(plain, string)
+        
+def test_dict_operations_keep_index():
+    cache = ObjectsCache()
+    cache.linear_scan_limit = 0
+    
+    cache |= {'foo': Word('foo')}
+    assert cache.find_contained('a foo b') == ('foo', Word('foo'))
+    
+    merged = cache | {'bar': Word('bar')}
+    assert isinstance(merged, ObjectsCache)
+    assert merged.find_contained('a bar foo') == ('foo', Word('foo')) # the insertion order is kept
+    assert cache.find_contained('a bar') is None
+    
+    copied = cache.copy()
+    assert isinstance(copied, ObjectsCache) and copied.linear_scan_limit == 0
+    copied['baz'] = Word('baz')
+    assert copied.find_contained('baz') == ('baz', Word('baz'))
+    assert 'baz' not in cache
+    
+    keys = ObjectsCache.fromkeys(['foo', 'bar'], Word('x'))
+    assert isinstance(keys, ObjectsCache)
+    keys.linear_scan_limit = 0
+    assert keys.find_contained('bar') == ('bar', Word('x'))
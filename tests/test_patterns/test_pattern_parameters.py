@@ -42,4 +42,29 @@ def test_undefined_typed_parameters():
         
 def test_extra_parameter_in_pattern():
     with pytest.raises(AssertionError, match='Can`t add parameter type "ExtraParameterInPattern": pattern parameters do not match properties annotated in class'):
-        Pattern.add_parameter_type(ExtraParameterInPattern)
\ No newline at end of file
+        Pattern.add_parameter_type(ExtraParameterInPattern)
+        
+def test_interning_invalidation():
+    class Invalidation(Object):
+        @classproperty
+        def pattern(cls) -> Pattern:
+            return Pattern('*')
+        
+    p = Pattern('lorem $name:Word dolor')
+    assert p is Pattern('lorem $name:Word dolor')
+    
+    Pattern.add_parameter_type(Invalidation)
+    try:
+        assert p is not Pattern('lorem $name:Word dolor')
+        assert p.compiled == Pattern('lorem $name:Word dolor').compiled
+    finally:
+        del Pattern._parameter_types['Invalidation']
+        Pattern._cache.clear()
+        
+async def test_parameters_of_different_types():
+    p = Pattern('$word:Word and $string:String')
+    m = await p.match('foo and bar baz')
+    assert m
+    assert type(m[0].parameters['word']) is Word
+    assert type(m[0].parameters['string']) is String
+    assert m[0].parameters == {'word': Word('foo'), 'string': String('bar baz')}
@@ -116,3 +116,30 @@ async def test_one_or_more_of():
     assert (await p.match('bbb Some bar here cccc'))[0].substring == 'Some bar here'
     assert (await p.match('bbb Some foo bar here cccc'))[0].substring == 'Some foo bar here'
     assert not await p.match('Some foo')
+    
+async def test_literals_prefilter():
+    p = Pattern('turn (on|off) the $device:Word')
+    assert p.literals == {'turn', 'the'}
+    assert p.could_match('please turn on the light')
+    assert not p.could_match('please switch on the light')
+    assert not await p.match('please switch on the light')
+    assert (await p.match('please turn on the light'))[0].substring == 'turn on the light'
+    
+    assert Pattern('Some *text here').literals == {'Some', 'text', 'here'}
+    assert Pattern('colou?r').literals == {'colo', 'r'}
+    assert Pattern('Some {foo|bar} here').literals == {'Some', 'here'}
+    assert Pattern('foo|bar').literals == set()
+    assert Pattern('**').literals == set()
+    assert Pattern('**').could_match('')
+    
+async def test_compiled_regex():
+    p = Pattern('lorem * dolor')
+    assert p.regex.pattern == p.compiled
+    assert p.regex is p.regex
+    
+    p.precompile()
+    assert p.regex.pattern == p.compiled
+    
+def test_interning():
+    assert Pattern('lorem * dolor') is Pattern('lorem * dolor')
+    assert Pattern('lorem * dolor') is not Pattern('lorem ** dolor')
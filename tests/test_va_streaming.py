@@ -0,0 +1,32 @@
+import anyio
+from stark.interfaces.protocols import SpeechSynthesizerStreaming
+
+
+class StreamingSpeechSynthesizerMock:
+    
+    def __init__(self):
+        self.results = []
+        
+    async def synthesize(self, text: str):
+        raise AssertionError('streaming synthesizer must be used for responses')
+    
+    async def synthesize_stream(self, text: str):
+        class Result:
+            async def play(self): pass
+        result = Result()
+        result.text = text
+        self.results.append(result)
+        return result
+
+async def test_streaming_synthesis(voice_assistant, autojump_clock):
+    async with voice_assistant() as voice_assistant:
+        assert not isinstance(voice_assistant.speech_synthesizer, SpeechSynthesizerStreaming)
+        await voice_assistant.speech_recognizer_did_receive_final_result('test')
+        await anyio.sleep(0.2)
+        assert [r.text for r in voice_assistant.speech_synthesizer.results] == ['test']
+        
+        voice_assistant.speech_synthesizer = StreamingSpeechSynthesizerMock()
+        assert isinstance(voice_assistant.speech_synthesizer, SpeechSynthesizerStreaming)
+        await voice_assistant.speech_recognizer_did_receive_final_result('test')
+        await anyio.sleep(0.2)
+        assert [r.text for r in voice_assistant.speech_synthesizer.results] == ['test']
@@ -0,0 +1,98 @@
+from stark.core import Pattern
+from stark.core.types import Object, Word
+from stark.general.classproperty import classproperty
+
+
+class Counter(Object):
+    
+    parsing_counter = 0
+    
+    @classproperty
+    def pattern(cls):
+        return Pattern('*')
+    
+    async def did_parse(self, from_string: str) -> str:
+        type(self).parsing_counter += 1
+        return from_string
+    
+class CachedCounter(Counter):
+    cache_parsing = True
+    parsing_counter = 0
+    
+class CachedFullName(Object):
+    first: Word
+    second: Word
+    cache_parsing = True
+    
+    @classproperty
+    def pattern(cls) -> Pattern:
+        return Pattern('$first:Word $second:Word')
+    
+async def test_parse_cache_disabled():
+    await Counter.parse('foo')
+    await Counter.parse('foo')
+    assert Counter.parsing_counter == 2
+    
+async def test_parse_cache():
+    first = await CachedCounter.parse('foo')
+    second = await CachedCounter.parse('foo')
+    assert CachedCounter.parsing_counter == 1
+    assert first.obj == second.obj
+    assert first.obj is not second.obj
+    assert first.substring == second.substring == 'foo'
+    
+    await CachedCounter.parse('bar')
+    assert CachedCounter.parsing_counter == 2
+    
+    # subclasses don't share the cache
+    assert CachedCounter._get_parse_cache() is not Word._get_parse_cache()
+    
+async def test_parse_cache_nested_parameters():
+    parameters = {'first': 'John', 'second': 'Galt'}
+    result = await CachedFullName.parse('John Galt', parameters)
+    assert result.obj.first == Word('John')
+    assert parameters == {}
+    
+    parameters = {'first': 'John', 'second': 'Galt'}
+    cached = await CachedFullName.parse('John Galt', parameters)
+    assert cached.obj.first == Word('John')
+    assert cached.obj.second == Word('Galt')
+    assert parameters == {}
+    
+class CachedGreeting(Object):
+    name: CachedFullName
+    cache_parsing = True
+    
+    @classproperty
+    def pattern(cls) -> Pattern:
+        return Pattern('hello $name:CachedFullName')
+    
+class UncachedCounter(CachedCounter):
+    parsing_counter = 0
+    
+async def test_parse_cache_grandchild_parameters():
+    Pattern.add_parameter_type(CachedFullName)
+    try:
+        for _ in range(2):
+            parameters = {'name': 'John Galt', 'first': 'John', 'second': 'Galt'}
+            result = await CachedGreeting.parse('hello John Galt', parameters)
+            assert result.obj.name.second == Word('Galt')
+            assert parameters == {}
+        assert CachedGreeting._get_parse_cache().hits == 1
+    finally:
+        del Pattern._parameter_types['CachedFullName']
+        Pattern._cache.clear()
+    
+async def test_parse_cache_deep_copy():
+    parameters = {'first': 'Ellis', 'second': 'Wyatt'}
+    first = await CachedFullName.parse('Ellis Wyatt', parameters)
+    first.obj.first.value = 'changed'
+    
+    parameters = {'first': 'Ellis', 'second': 'Wyatt'}
+    second = await CachedFullName.parse('Ellis Wyatt', parameters)
+    assert second.obj.first == Word('Ellis')
+    
+async def test_parse_cache_not_inherited():
+    await UncachedCounter.parse('foo')
+    await UncachedCounter.parse('foo')
+    assert UncachedCounter.parsing_counter == 2